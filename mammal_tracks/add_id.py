@@ -1,27 +1,58 @@
 import csv
+import os
+import tempfile
 
 csv.field_size_limit(100000000)  # Augmenter la taille limite des champs CSV
 
-def add_id_column(input_csv, output_csv):
-    # Lire le fichier CSV existant
+def _max_existing_id(input_csv):
+    # Première passe en flux : on ne garde que le plus grand id déjà attribué
+    max_id = -1
     with open(input_csv, mode='r', newline='', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)  # Lire le fichier avec DictReader (permet d'accéder par clé)
-        rows = list(reader)  # Charger toutes les lignes dans une liste
-        
-        # Ajouter l'ID à chaque ligne
-        for index, row in enumerate(rows):
-            row['id'] = index  # Ajouter l'ID (index de la ligne)
-        
-        # Sauvegarder les nouvelles lignes dans un nouveau fichier CSV
-        with open(output_csv, mode='w', newline='', encoding='utf-8') as outfile:
-            fieldnames = ['id'] + reader.fieldnames  # Ajouter "id" au début des noms de colonnes existants
+        for row in csv.DictReader(infile):
+            value = row.get('id')
+            if value not in (None, '') and value.isdigit():
+                max_id = max(max_id, int(value))
+    return max_id
+
+def add_id_column(input_csv, output_csv=None, only_missing=False):
+    """Ajoute une colonne 'id' ligne par ligne, sans charger le fichier en mémoire.
+
+    Le résultat est écrit dans un fichier temporaire du même dossier puis
+    renommé atomiquement sur output_csv (par défaut input_csv). Avec
+    only_missing=True, les id existants sont conservés et seules les lignes
+    sans id en reçoivent un, à la suite du plus grand id présent.
+    """
+    output_csv = output_csv or input_csv
+    next_id = _max_existing_id(input_csv) + 1 if only_missing else 0
+
+    out_dir = os.path.dirname(os.path.abspath(output_csv))
+    fd, tmp_path = tempfile.mkstemp(prefix='.add_id-', suffix='.csv', dir=out_dir)
+    try:
+        with open(input_csv, mode='r', newline='', encoding='utf-8') as infile, \
+             os.fdopen(fd, mode='w', newline='', encoding='utf-8') as outfile:
+            reader = csv.DictReader(infile)  # Lire le fichier avec DictReader (permet d'accéder par clé)
+            fieldnames = reader.fieldnames or []
+            if 'id' not in fieldnames:
+                fieldnames = ['id'] + fieldnames  # Ajouter "id" au début des noms de colonnes existants
             writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()  # Écrire l'en-tête avec la nouvelle colonne "id"
-            writer.writerows(rows)  # Écrire toutes les lignes avec la nouvelle colonne "id"
-        
+            writer.writeheader()  # Écrire l'en-tête avec la colonne "id"
+
+            for row in reader:
+                if not (only_missing and row.get('id') not in (None, '')):
+                    row['id'] = next_id
+                    next_id += 1
+                writer.writerow(row)
+
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.replace(tmp_path, output_csv)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
     print(f"Le fichier CSV a été mis à jour et sauvegardé sous '{output_csv}'.")
 
-# Exemple d'utilisation
-input_csv = 'tracks_with_image.csv'  # Nom de votre fichier CSV d'entrée
-output_csv = 'tracks_with_image.csv'  # Nom du fichier de sortie avec la colonne 'id'
-add_id_column(input_csv, output_csv)
+if __name__ == "__main__":
+    # Exemple d'utilisation : réécriture sur place, id attribués aux seules lignes qui n'en ont pas
+    add_id_column('tracks_with_image.csv', only_missing=True)
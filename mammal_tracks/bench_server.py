@@ -0,0 +1,256 @@
+"""Local stand-in for naturetracking.com, iNaturalist and Google Custom Search.
+
+Serves deterministic synthetic content so the scrapers can be benchmarked
+without touching the real sites:
+
+- ``/mammal-tracks/``        jig gallery with a "Load more" button (batches from ``/mammal-tracks/more``)
+- ``/``, ``/database``, ``/species/<n>``  guide, database and species pages for NatureTrackingScraper
+- ``/observations?page=N``   iNaturalist-style observation grid, empty past the last page
+- ``/v1/observations``       observations API (``id_above`` cursor)
+- ``/customsearch/v1``       Custom Search JSON, 10 results per page
+- ``/images/<name>.jpg``     JPEG payloads, with configurable latency and error rate
+"""
+import argparse
+import io
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from PIL import Image, ImageDraw
+
+SPECIES = ['red_fox', 'lynx', 'badger', 'wolf', 'otter', 'roe_deer', 'wild_boar', 'hare', 'marten', 'beaver']
+
+
+@dataclass
+class StubConfig:
+    tracks: int = 200  # gallery entries
+    batch_size: int = 24  # gallery entries per "Load more"
+    observations: int = 400
+    per_page: int = 24  # observations per /observations page
+    species_pages: int = 20
+    search_results: int = 100  # per Custom Search query
+    image_latency: float = 0.0  # seconds added to every image response
+    error_rate: float = 0.0  # share of image requests answered with a 503
+    image_size: int = 640
+    seed: int = 0
+
+
+def make_jpeg(size: int, seed: int) -> bytes:
+    """Light background with a few dark blobs, so the contour detector has work to do."""
+    rng = random.Random(seed)
+    image = Image.new('L', (size, size), 220)
+    draw = ImageDraw.Draw(image)
+    for _ in range(5):
+        x, y = rng.randrange(size - 120), rng.randrange(size - 120)
+        draw.ellipse((x, y, x + rng.randrange(40, 120), y + rng.randrange(40, 120)), fill=rng.randrange(20, 80))
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = 'BenchStub/1.0'
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes: with Nagle, delayed ACK would add ~40 ms per keep-alive request
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    def send_body(self, body: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_html(self, html: str):
+        self.send_body(html.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def send_json(self, payload):
+        self.send_body(json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def base(self) -> str:
+        return f"http://{self.headers.get('Host')}"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path
+        if path.startswith('/images/'):
+            return self.image(path)
+        if path == '/robots.txt':
+            return self.send_body(b'User-agent: *\nDisallow: /private\n', 'text/plain')
+        if path == '/mammal-tracks/':
+            return self.gallery()
+        if path == '/mammal-tracks/more':
+            return self.gallery_batch(int(query.get('offset', 0)))
+        if path == '/observations':
+            return self.observations(int(query.get('page', 1)))
+        if path == '/v1/observations':
+            return self.observations_api(int(query.get('id_above', 0)), int(query.get('per_page', 200)))
+        if path == '/customsearch/v1':
+            return self.custom_search(query.get('q', ''), int(query.get('start', 1)), int(query.get('num', 10)))
+        if path == '/':
+            return self.guides()
+        if path.rstrip('/') == '/database':
+            return self.database()
+        if path.startswith('/species/'):
+            return self.species_page(path.rsplit('/', 1)[-1])
+        self.send_body(b'not found', 'text/plain', 404)
+
+    def image(self, path: str):
+        if self.config.image_latency:
+            time.sleep(self.config.image_latency)
+        if self.server.rng_random() < self.config.error_rate:
+            return self.send_body(b'unavailable', 'text/plain', 503)
+        self.send_body(self.server.jpeg(path), 'image/jpeg')
+
+    # naturetracking.com gallery
+
+    def track_container(self, i: int) -> str:
+        species = SPECIES[i % len(SPECIES)]
+        return (f'<div class="jig-imageContainer"><a class="jig-link" href="{self.base()}/images/track_{i}.jpg">'
+                f'<img class="jig-photo-image" src="{self.base()}/images/track_{i}_preview.jpg">'
+                f'<div class="jig-caption-title">{species.replace("_", " ").title()} track {i}</div></a></div>')
+
+    def gallery(self):
+        first = ''.join(self.track_container(i) for i in range(min(self.config.batch_size, self.config.tracks)))
+        self.send_html(f"""<html><body>
+<div class="jig-filter" data-filter-slug="all">All</div><div class="jig-filter" data-filter-slug="tracks">Tracks</div>
+<div id="gallery">{first}</div>
+<div class="jig-loadMoreButton">Load more</div>
+<script>
+const button = document.querySelector('.jig-loadMoreButton');
+button.addEventListener('click', async () => {{
+    button.textContent = 'Loading...';
+    const offset = document.querySelectorAll('.jig-imageContainer').length;
+    const response = await fetch('/mammal-tracks/more?offset=' + offset);
+    const batch = await response.json();
+    document.getElementById('gallery').insertAdjacentHTML('beforeend', batch.html);
+    if (batch.done) button.remove(); else button.textContent = 'Load more';
+}});
+</script></body></html>""")
+
+    def gallery_batch(self, offset: int):
+        end = min(offset + self.config.batch_size, self.config.tracks)
+        self.send_json({
+            'html': ''.join(self.track_container(i) for i in range(offset, end)),
+            'done': end >= self.config.tracks,
+        })
+
+    # naturetracking.com guides and database
+
+    def guides(self):
+        links = ''.join(f'<a href="/species/{i}">s{i}</a>' for i in range(self.config.species_pages))
+        articles = ''.join(
+            f'<article><h2>{name.title()}</h2><div class="content">Tracks of the {name}.</div>'
+            f'<img src="/images/guide_{name}.jpg"></article>' for name in SPECIES
+        )
+        self.send_html(f'<html><body><nav>{links}<a href="/database">db</a></nav>{articles}</body></html>')
+
+    def database(self):
+        entries = ''.join(
+            f'<div class="track-entry"><h3>{name}</h3><div class="details">Four toes, {i + 3} cm.</div></div>'
+            for i, name in enumerate(SPECIES)
+        )
+        self.send_html(f'<html><body>{entries}</body></html>')
+
+    def species_page(self, key: str):
+        try:
+            i = int(key)
+        except ValueError:
+            return self.send_body(b'not found', 'text/plain', 404)
+        name = SPECIES[i % len(SPECIES)]
+        self.send_html(f'<html><body><article><h2>{name.title()} {i}</h2><div class="content">Species page {i}.</div>'
+                       f'<img src="/images/species_{i}.jpg"></article><a href="/species/{(i + 1) % self.config.species_pages}">next</a>'
+                       f'</body></html>')
+
+    # iNaturalist
+
+    def observations(self, page: int):
+        start = (page - 1) * self.config.per_page
+        end = min(start + self.config.per_page, self.config.observations)
+        cells = ''.join(
+            f'<div class="thumbnail borderless d-flex flex-column">'
+            f'<div class="photo has-photo" style="background-image: url(&quot;{self.base()}/images/obs_{i}.jpg&quot;);"></div>'
+            f'<span class="display-name comname">{SPECIES[i % len(SPECIES)].replace("_", " ")}</span></div>'
+            for i in range(start, end)
+        )
+        self.send_html(f'<html><body><div class="grid">{cells}</div></body></html>')
+
+    def observations_api(self, id_above: int, per_page: int):
+        first = id_above + 1
+        last = min(id_above + per_page, self.config.observations)
+        self.send_json({'results': [
+            {'id': i, 'taxon': {'preferred_common_name': SPECIES[i % len(SPECIES)].replace('_', ' '), 'name': 'x'},
+             'photos': [{'url': f'{self.base()}/images/obs_{i}/square.jpg'}]}
+            for i in range(first, last + 1)
+        ]})
+
+    # Google Custom Search
+
+    def custom_search(self, q: str, start: int, num: int):
+        species = q.split(' (')[0].replace(' ', '_').lower()
+        end = min(start - 1 + num, self.config.search_results)
+        self.send_json({'items': [
+            {'link': f'{self.base()}/images/search_{species}_{i}_track.jpg',
+             'displayLink': 'tracks.example.org', 'snippet': 'animal footprint in mud', 'mime': 'image/jpeg'}
+            for i in range(start, end + 1)
+        ]})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: StubConfig):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.rng_lock = threading.Lock()
+        self.jpegs = [make_jpeg(config.image_size, config.seed + i) for i in range(8)]
+
+    def rng_random(self) -> float:
+        with self.rng_lock:
+            return self.rng.random()
+
+    def jpeg(self, path: str) -> bytes:
+        """One of the pre-rendered JPEGs, made unique per path with a COM segment after SOI.
+
+        Identical bodies would send every download down the ImageStore's duplicate path.
+        """
+        base = self.jpegs[zlib.crc32(path.encode()) % len(self.jpegs)]
+        comment = path.encode('utf-8')[:65000]
+        return base[:2] + b'\xff\xfe' + (len(comment) + 2).to_bytes(2, 'big') + comment + base[2:]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(config: StubConfig = None, port: int = 0) -> StubServer:
+    """Start the stub in a daemon thread; port 0 picks a free port (see ``server.base_url``)."""
+    server = StubServer(('127.0.0.1', port), config or StubConfig())
+    threading.Thread(target=server.serve_forever, name='bench-stub', daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the benchmark stand-in sites")
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to image responses")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of image requests failing with 503")
+    args = parser.parse_args()
+    server = StubServer(('127.0.0.1', args.port), StubConfig(image_latency=args.latency, error_rate=args.error_rate))
+    print(f"Serving on {server.base_url}")
+    server.serve_forever()
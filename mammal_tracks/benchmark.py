@@ -0,0 +1,293 @@
+"""End-to-end throughput benchmarks against the local stand-in server (bench_server).
+
+Each stage runs in its own subprocess and temporary working directory, so
+peak RSS and CPU time are per stage. Example::
+
+    python benchmark.py --items 300 --latency 0.02 --error-rate 0.02 --output bench.json
+    python benchmark.py --baseline bench.json   # exit 1 if items/s dropped past --tolerance
+"""
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import psutil
+
+from bench_server import SPECIES, StubConfig, start_stub_server
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FAST_RATE = {'host_rate': 10000.0, 'host_burst': 10000}
+FAST_IMAGE_RATE = {'image_rate': 10000.0, 'image_burst': 10000}  # i_naturalist: separate CDN limiter
+
+
+def sample_value(name: str, labels: dict) -> float:
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+# Stages: each returns the number of items it processed
+
+def bench_nature_crawl(base_url: str, items: int) -> int:
+    """NatureTrackingScraper crawl: frontier, fetch, parse, guide images."""
+    spec = importlib.util.spec_from_file_location('nature_tracking_guides',
+                                                  os.path.join(HERE, 'mammal_tracks', 'nature_tracking.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    config = module.ScraperConfig(base_url=base_url, store_dir='data/store', crawl_max_depth=3,
+                                  crawl_max_pages=items, metrics_port=0, **FAST_RATE)
+    module.NatureTrackingScraper(config).run()
+    return int(sample_value('scraper_pages_total', {'scraper': 'naturetracking_guides'}))
+
+
+def bench_parse(base_url: str, items: int) -> int:
+    """Guide + database parse path alone (lxml + SoupStrainer)."""
+    import requests
+    spec = importlib.util.spec_from_file_location('nature_tracking_guides',
+                                                  os.path.join(HERE, 'mammal_tracks', 'nature_tracking.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    guides = requests.get(base_url + '/', timeout=10).text
+    database = requests.get(base_url + '/database', timeout=10).text
+    scraper = module.NatureTrackingScraper.__new__(module.NatureTrackingScraper)
+    for _ in range(items):
+        scraper.parse(guides, module.GUIDE_NODES).find_all('article')
+        scraper.parse(database, module.TRACK_ENTRY_NODES).find_all('div', class_='track-entry')
+    return 2 * items
+
+
+def gallery_items(base_url: str, items: int):
+    return [{'animal_name': SPECIES[i % len(SPECIES)], 'image_url': f'{base_url}/images/track_{i}.jpg',
+             'preview_url': f'{base_url}/images/track_{i}_preview.jpg'} for i in range(items)]
+
+
+def bench_gallery_download(base_url: str, items: int) -> int:
+    """MammalTracksScraper.download_images: thread pool, per-host slots, image store."""
+    from image_store import ImageStore
+    from nature_tracking import MammalTracksScraper
+    scraper = MammalTracksScraper.__new__(MammalTracksScraper)  # downloads only, no browser
+    data = scraper.download_images(gallery_items(base_url, items), workers=8, per_host=8, store=ImageStore())
+    return sum(item['status'] == 'ok' for item in data)
+
+
+def bench_gallery_browser(base_url: str, items: int) -> int:
+    """MammalTracksScraper gallery: load-more loop and bulk extraction (needs Chrome)."""
+    from selenium.webdriver.support.ui import WebDriverWait
+    from nature_tracking import MammalTracksScraper
+    scraper = MammalTracksScraper(headless=True)
+    try:
+        scraper.GALLERY_URL = base_url + '/mammal-tracks/'
+        scraper.wait = WebDriverWait(scraper.driver, 3)
+        result = scraper.scrape_tracks()
+        return len(result.tracks) if result else 0
+    finally:
+        scraper.close()
+
+
+def bench_inat_api(base_url: str, items: int) -> int:
+    """MammalTrackScraper API source: cursor pagination and downloads."""
+    from i_naturalist import MammalTrackScraper, ScraperConfig
+    config = ScraperConfig(source='api', api_url=base_url + '/v1/observations', store_dir='data/store',
+                           metrics_port=0, **FAST_RATE, **FAST_IMAGE_RATE)
+    MammalTrackScraper(config).run()
+    return int(sample_value('scraper_images_total', {'scraper': 'inaturalist', 'status': 'ok'}))
+
+
+def bench_inat_browser(base_url: str, items: int) -> int:
+    """MammalTrackScraper browser source: page loads, scrolling, extraction (needs Chrome)."""
+    from i_naturalist import MammalTrackScraper, ScraperConfig
+    config = ScraperConfig(base_url=base_url + '/observations', store_dir='data/store', headless=True,
+                           page_load_timeout=2, metrics_port=0, **FAST_RATE, **FAST_IMAGE_RATE)
+    MammalTrackScraper(config).run()
+    return int(sample_value('scraper_images_total', {'scraper': 'inaturalist', 'status': 'ok'}))
+
+
+def bench_google_search(base_url: str, items: int) -> int:
+    """scrap_google.fetch_images: query planning, search cache, filtering."""
+    import scrap_google
+    from query_planner import QueryPlanner
+    from search_cache import SearchCache
+    scrap_google.SEARCH_ENDPOINT = base_url + '/customsearch/v1'
+    cache = SearchCache('data/search_cache')
+    planner = QueryPlanner(scrap_google.FOOTPRINT_KEYWORDS, stats_path='data/query_stats.json')
+    found = 0
+    for i in range(max(1, items // scrap_google.MAX_IMAGES)):
+        animal = f"{SPECIES[i % len(SPECIES)]} {i}"
+        found += len(scrap_google.fetch_images(animal, seen=set(), cache=cache, planner=planner))
+    return found
+
+
+def bench_google_detect(base_url: str, items: int) -> int:
+    """scrap_google.detect_footprints_batch: concurrent fetch + multi-process detection."""
+    import scrap_google
+    urls = [f'{base_url}/images/search_{i}_track.jpg' for i in range(items)]
+    scrap_google.detect_footprints_batch(urls)
+    return len(urls)
+
+
+STAGES = {
+    'nature_crawl': bench_nature_crawl,
+    'parse': bench_parse,
+    'gallery_download': bench_gallery_download,
+    'gallery_browser': bench_gallery_browser,
+    'inat_api': bench_inat_api,
+    'inat_browser': bench_inat_browser,
+    'google_search': bench_google_search,
+    'google_detect': bench_google_detect,
+}
+BROWSER_STAGES = {'gallery_browser', 'inat_browser'}
+
+
+# Measurement
+
+class PeakRss(threading.Thread):
+    """Samples the RSS of this process and its children until stopped."""
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+        self.process = psutil.Process()
+
+    def sample(self):
+        total = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, total)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self) -> int:
+        self.sample()
+        self.stopped.set()
+        return self.peak
+
+
+def cpu_seconds(process: psutil.Process) -> float:
+    times = process.cpu_times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def run_stage(name: str, base_url: str, items: int) -> dict:
+    """Runs in the stage subprocess."""
+    sys.stdout = sys.stderr  # the result JSON is the only thing on stdout
+    process = psutil.Process()
+    sampler = PeakRss()
+    sampler.start()
+    cpu_start = cpu_seconds(process)
+    started = time.perf_counter()
+    count = STAGES[name](base_url, items)
+    elapsed = time.perf_counter() - started
+    cpu = cpu_seconds(process) - cpu_start
+    peak = sampler.stop()
+    sys.stdout = sys.__stdout__
+    return {
+        'stage': name, 'items': count, 'seconds': round(elapsed, 3),
+        'items_per_s': round(count / elapsed, 2) if elapsed else 0.0,
+        'cpu_seconds': round(cpu, 3), 'cpu_percent': round(100 * cpu / elapsed, 1) if elapsed else 0.0,
+        'peak_rss_mb': round(peak / 2 ** 20, 1),
+    }
+
+
+def launch_stage(name: str, base_url: str, items: int, keep_trace: bool) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f'bench-{name}-')
+    env = dict(os.environ, SCRAPER_METRICS_PORT='0',
+               PYTHONPATH=os.pathsep.join([HERE, os.environ.get('PYTHONPATH', '')]))
+    if not keep_trace:
+        env['SCRAPER_TRACE_FILE'] = ''
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-stage', name, '--base-url', base_url,
+             '--items', str(items)],
+            cwd=workdir, env=env, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1:] or ['failed']
+            return {'stage': name, 'error': error[0]}
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(results, baseline, tolerance: float):
+    previous = {row['stage']: row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get(row['stage'])
+        if not before or 'error' in row or 'error' in before or not before['items_per_s']:
+            continue
+        change = row['items_per_s'] / before['items_per_s'] - 1
+        row['change'] = round(change, 3)
+        if change < -tolerance:
+            regressions.append(row['stage'])
+    return regressions
+
+
+def print_results(results):
+    print(f"{'stage':<18} {'items':>7} {'s':>8} {'items/s':>9} {'cpu s':>8} {'cpu %':>7} {'peak MB':>8} {'vs base':>8}")
+    for row in results:
+        if 'error' in row:
+            print(f"{row['stage']:<18} error: {row['error']}")
+            continue
+        change = f"{row['change']:+.0%}" if 'change' in row else ''
+        print(f"{row['stage']:<18} {row['items']:>7} {row['seconds']:>8.2f} {row['items_per_s']:>9.1f} "
+              f"{row['cpu_seconds']:>8.2f} {row['cpu_percent']:>7.1f} {row['peak_rss_mb']:>8.1f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against the local stand-in server")
+    parser.add_argument('stages', nargs='*', help=f"stages to run (default: all but browser ones): {', '.join(STAGES)}")
+    parser.add_argument('--items', type=int, default=200, help="gallery entries, observations, images... per stage")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every image response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of image requests failing with 503")
+    parser.add_argument('--browser', action='store_true', help="also run the Selenium stages (needs Chrome)")
+    parser.add_argument('--trace', action='store_true', help="keep the per-request trace in each stage")
+    parser.add_argument('--output', help="write the results as JSON")
+    parser.add_argument('--baseline', help="results JSON of a previous run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="allowed items/s drop before failing")
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        print(json.dumps(run_stage(args.run_stage, args.base_url, args.items)))
+        return
+
+    stages = args.stages or [name for name in STAGES if args.browser or name not in BROWSER_STAGES]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    config = StubConfig(tracks=args.items, observations=args.items, search_results=100,
+                        image_latency=args.latency, error_rate=args.error_rate)
+    server = start_stub_server(config)
+    try:
+        results = [launch_stage(name, server.base_url, args.items, args.trace) for name in stages]
+    finally:
+        server.shutdown()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
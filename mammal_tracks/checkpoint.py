@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class CrawlCheckpoint:
+    """Crawl progress persisted as JSON: cursor, completed pages, pending downloads.
+
+    Changes are written at most every `interval` seconds (and on sync()) to a
+    temp file that is fsynced and renamed over the checkpoint, so a crash
+    loses at most that much progress and never leaves a torn file. Without
+    ``resume`` any previous checkpoint is ignored and overwritten.
+    """
+
+    def __init__(self, path: str, resume: bool = False, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self._lock = threading.RLock()
+        self._last_sync = time.monotonic()
+        self._dirty = False
+        self.state: Dict[str, Any] = {'cursor': None, 'completed_pages': [], 'pending': {}, 'data': {}}
+        if resume and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.state.update(json.load(f))
+            logging.info(f"Resuming from {path}: cursor={self.state['cursor']}, "
+                         f"{len(self.state['completed_pages'])} pages done, "
+                         f"{len(self.state['pending'])} pending downloads")
+        self._completed = set(self.state['completed_pages'])
+
+    @property
+    def cursor(self):
+        return self.state['cursor']
+
+    def set_cursor(self, value):
+        with self._lock:
+            self.state['cursor'] = value
+            self._changed()
+
+    def complete_page(self, page: int):
+        with self._lock:
+            if page not in self._completed:
+                self._completed.add(page)
+                self.state['completed_pages'].append(page)
+                self._changed()
+
+    def is_page_done(self, page: int) -> bool:
+        return page in self._completed
+
+    def first_incomplete_page(self, start: int = 1) -> int:
+        page = start
+        while page in self._completed:
+            page += 1
+        return page
+
+    def add_pending(self, key: str, meta: Optional[dict] = None):
+        with self._lock:
+            self.state['pending'][key] = meta or {}
+            self._changed()
+
+    def done(self, key: str):
+        with self._lock:
+            if self.state['pending'].pop(key, None) is not None:
+                self._changed()
+
+    def pending(self) -> Dict[str, dict]:
+        with self._lock:
+            return dict(self.state['pending'])
+
+    def get(self, name: str, default=None):
+        return self.state['data'].get(name, default)
+
+    def put(self, name: str, value):
+        with self._lock:
+            self.state['data'][name] = value
+            self._changed()
+
+    def _changed(self):
+        self._dirty = True
+        if time.monotonic() - self._last_sync >= self.interval:
+            self.sync()
+
+    def sync(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self.state['completed_pages'] = sorted(self._completed)
+            self.state['updated_at'] = time.time()
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.checkpoint-', dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            if hasattr(os, 'O_DIRECTORY'):
+                dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            self._dirty = False
+            self._last_sync = time.monotonic()
+
+    def finish(self):
+        """The crawl completed: drop the checkpoint so the next run starts fresh."""
+        with self._lock:
+            self._dirty = False
+            if os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+from lxml import etree
+
+# Links to these are assets, not pages to crawl
+SKIP_EXTENSIONS = re.compile(
+    r'\.(jpe?g|png|gif|webp|svg|ico|bmp|pdf|zip|gz|mp4|webm|mp3|css|js|woff2?|ttf|xml)$', re.IGNORECASE
+)
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|replytocom)$')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Canonical form used for deduplication, or None if the URL is not crawlable."""
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if parts.port and parts.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+    path = re.sub(r'/{2,}', '/', parts.path) or '/'
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not TRACKING_PARAMS.match(k)))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class LinkCollector:
+    """lxml parser target keeping the href of <a> start tags; no tree is built."""
+
+    def __init__(self):
+        self.links: List[str] = []
+
+    def start(self, tag, attrib):
+        if tag == 'a':
+            href = attrib.get('href')
+            if href:
+                self.links.append(href)
+
+    def close(self) -> List[str]:
+        return self.links
+
+
+def extract_links(html: str) -> List[str]:
+    parser = etree.HTMLParser(target=LinkCollector())
+    try:
+        parser.feed(html)
+        return parser.close()
+    except (ValueError, etree.ParserError, etree.XMLSyntaxError):
+        return []
+
+
+@dataclass
+class CrawlConfig:
+    concurrency: int = 8
+    max_depth: int = 2
+    max_pages: int = 1000
+    max_pages_per_host: Optional[int] = None
+    allowed_hosts: Optional[Set[str]] = None  # defaults to the hosts of the seeds
+    respect_robots: bool = True
+    user_agent: str = '*'
+    min_delay: float = 0.0  # per-host delay when robots.txt sets no Crawl-delay
+
+
+@dataclass
+class HostState:
+    robots: Optional[RobotFileParser] = None
+    delay: float = 0.0
+    next_request: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class CrawlFrontier:
+    """Breadth-first asyncio crawl over a blocking fetch function.
+
+    `fetch(url)` returns a requests-like response (``url``, ``status_code``,
+    ``headers``, ``text``) or None and runs in worker threads, so the
+    caller's session, HTTP cache and rate limiter stay in the path.
+    `handlers` are ``(path_regex, callable(url, html))`` pairs; every
+    handler whose pattern matches the page path is called, also in a
+    thread. robots.txt is fetched once per host and its Crawl-delay is
+    honoured between requests to that host. `queue_gauge` (a Prometheus
+    Gauge child) tracks the number of queued URLs.
+    """
+
+    def __init__(self, fetch: Callable, handlers: List[Tuple[str, Callable]],
+                 config: Optional[CrawlConfig] = None, queue_gauge=None):
+        self.fetch = fetch
+        self.queue_gauge = queue_gauge
+        self.handlers = [(re.compile(pattern), handler) for pattern, handler in handlers]
+        self.config = config or CrawlConfig()
+        self.seen: Set[str] = set()
+        self.hosts: Dict[str, HostState] = {}
+        self.allowed_hosts = self.config.allowed_hosts
+        self.pages_per_host: Counter = Counter()
+        self.stats: Counter = Counter()
+
+    def host_state(self, host: str) -> HostState:
+        if host not in self.hosts:
+            self.hosts[host] = HostState(delay=self.config.min_delay)
+        return self.hosts[host]
+
+    async def load_robots(self, scheme: str, host: str, state: HostState):
+        robots_url = f"{scheme}://{host}/robots.txt"
+        parser = RobotFileParser(robots_url)
+        response = await asyncio.to_thread(self.fetch, robots_url)
+        if response is not None and response.status_code == 200:
+            parser.parse(response.text.splitlines())
+            delay = parser.crawl_delay(self.config.user_agent)
+            if delay:
+                state.delay = max(state.delay, float(delay))
+        else:
+            parser.allow_all = True
+        state.robots = parser
+
+    async def allowed(self, url: str) -> bool:
+        parts = urlsplit(url)
+        state = self.host_state(parts.netloc)
+        if not self.config.respect_robots:
+            return True
+        async with state.lock:
+            if state.robots is None:
+                await self.load_robots(parts.scheme, parts.netloc, state)
+        return state.robots.can_fetch(self.config.user_agent, url)
+
+    async def wait_turn(self, host: str):
+        state = self.host_state(host)
+        async with state.lock:
+            now = time.monotonic()
+            wait = state.next_request - now
+            state.next_request = max(now, state.next_request) + state.delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def enqueue(self, queue: asyncio.Queue, url: str, depth: int):
+        if url is None or url in self.seen or SKIP_EXTENSIONS.search(urlsplit(url).path):
+            return
+        host = urlsplit(url).netloc
+        if self.allowed_hosts is not None and host not in self.allowed_hosts:
+            return
+        if len(self.seen) >= self.config.max_pages:
+            return
+        self.seen.add(url)
+        queue.put_nowait((url, depth))
+
+    async def visit(self, queue: asyncio.Queue, url: str, depth: int):
+        host = urlsplit(url).netloc
+        limit = self.config.max_pages_per_host
+        if limit is not None and self.pages_per_host[host] >= limit:
+            self.stats['host_limit'] += 1
+            return
+        if not await self.allowed(url):
+            self.stats['robots_disallowed'] += 1
+            return
+        self.pages_per_host[host] += 1
+        await self.wait_turn(host)
+        response = await asyncio.to_thread(self.fetch, url)
+        if response is None or response.status_code != 200:
+            self.stats['failed'] += 1
+            return
+        if 'html' not in response.headers.get('Content-Type', 'text/html'):
+            self.stats['not_html'] += 1
+            return
+        self.stats['fetched'] += 1
+        final_url = normalize_url(response.url) or url
+        self.seen.add(final_url)
+        html = response.text
+
+        path = urlsplit(final_url).path
+        for pattern, handler in self.handlers:
+            if pattern.search(path):
+                try:
+                    await asyncio.to_thread(handler, final_url, html)
+                except Exception as e:
+                    logging.error(f"Handler {handler.__name__} failed on {final_url}: {e}")
+
+        if depth < self.config.max_depth:
+            # Off the event loop, like the handlers: other workers keep fetching meanwhile
+            for href in await asyncio.to_thread(extract_links, html):
+                self.enqueue(queue, normalize_url(href, final_url), depth + 1)
+
+    async def worker(self, queue: asyncio.Queue):
+        while True:
+            url, depth = await queue.get()
+            if self.queue_gauge is not None:
+                self.queue_gauge.set(queue.qsize())
+            try:
+                await self.visit(queue, url, depth)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logging.error(f"Crawl error on {url}: {e}")
+            finally:
+                queue.task_done()
+
+    async def crawl(self, seeds: List[str]) -> Counter:
+        seeds = [normalize_url(seed) for seed in seeds]
+        if self.allowed_hosts is None:
+            self.allowed_hosts = {urlsplit(seed).netloc for seed in seeds if seed}
+        queue: asyncio.Queue = asyncio.Queue()
+        for seed in seeds:
+            self.enqueue(queue, seed, 0)
+        workers = [asyncio.create_task(self.worker(queue)) for _ in range(max(1, self.config.concurrency))]
+        await queue.join()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        logging.info(f"Crawl finished: {dict(self.stats)}, {len(self.seen)} URLs seen")
+        return self.stats
+
+    def run(self, seeds: List[str]) -> Counter:
+        return asyncio.run(self.crawl(seeds))
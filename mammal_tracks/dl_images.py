@@ -1,11 +1,12 @@
 import csv
 import requests
 import base64
-from io import BytesIO
-import time
 
-# Fonction pour télécharger l'image depuis l'URL et la convertir en base64
-def image_to_base64(url):
+from image_pack import ImagePackWriter
+from rate_limit import HostRateLimiter
+
+# Fonction pour télécharger l'image depuis l'URL (octets bruts)
+def download_image_bytes(url):
     try:
         print(f"Tentative de téléchargement de l'image depuis : {url}")
         response = requests.get(url, timeout=10)  # Timeout pour éviter un blocage trop long
@@ -13,11 +14,7 @@ def image_to_base64(url):
 
         # Vérifiez que l'URL correspond bien à une image (en fonction du type MIME)
         if 'image' in response.headers.get('Content-Type', ''):
-            # Convertir l'image en base64
-            image_data = BytesIO(response.content)
-            encoded_image = base64.b64encode(image_data.read()).decode('utf-8')
-            print(f"Image téléchargée et encodée en base64.")
-            return encoded_image
+            return response.content
         else:
             print(f"URL non image : {url}")
             return None
@@ -28,35 +25,68 @@ def image_to_base64(url):
         print(f"Erreur avec l'URL {url}: {e}")
         return None
 
+# Fonction pour télécharger l'image depuis l'URL et la convertir en base64
+def image_to_base64(url):
+    image_data = download_image_bytes(url)
+    if image_data is None:
+        return None
+    encoded_image = base64.b64encode(image_data).decode('utf-8')
+    print(f"Image téléchargée et encodée en base64.")
+    return encoded_image
+
 # Lire le CSV existant et modifier les URLs des images
-def update_csv(input_csv, output_csv):
-    with open(input_csv, mode='r', newline='', encoding='utf-8') as infile, \
-         open(output_csv, mode='w', newline='', encoding='utf-8') as outfile:
-        
-        reader = csv.DictReader(infile)
-        fieldnames = reader.fieldnames
-        
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-        for row in reader:
-            # Supposons que la colonne contenant l'URL de l'image s'appelle 'image_url'
-            image_url = row.get('image_url')
-            if image_url:
-                print(f"Traitement de l'image pour : {image_url}")
-                # Remplacer l'URL de l'image par l'image en base64
-                base64_image = image_to_base64(image_url)
-                if base64_image:
-                    row['image_url'] = base64_image
+def update_csv(input_csv, output_csv, rate_limiter=None, pack_path=None):
+    """Télécharge l'image de chaque ligne de input_csv.
+
+    Sans pack_path, l'image est encodée en base64 dans la colonne 'image_url'
+    (ancien format). Avec pack_path, les octets sont ajoutés au pack binaire
+    (voir image_pack) et le CSV ne garde que les métadonnées : 'image_url'
+    reste l'URL d'origine et 'image_index' donne la position dans le pack.
+    Le pack est recréé avec le CSV : ses index ne valent que pour ce CSV.
+    """
+    # Limiteur par hôte : les lignes pointant vers des hôtes différents ne s'attendent pas
+    rate_limiter = rate_limiter or HostRateLimiter(rate=1.0, burst=2)
+    pack = ImagePackWriter(pack_path, reset=True) if pack_path else None
+
+    try:
+        with open(input_csv, mode='r', newline='', encoding='utf-8') as infile, \
+             open(output_csv, mode='w', newline='', encoding='utf-8') as outfile:
+            
+            reader = csv.DictReader(infile)
+            fieldnames = list(reader.fieldnames)
+            if pack and 'image_index' not in fieldnames:
+                fieldnames.append('image_index')
+            
+            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+            writer.writeheader()
+
+            for row in reader:
+                # Supposons que la colonne contenant l'URL de l'image s'appelle 'image_url'
+                image_url = row.get('image_url')
+                if image_url:
+                    print(f"Traitement de l'image pour : {image_url}")
+                    rate_limiter.acquire(image_url)
+                    if pack:
+                        # Ajouter les octets au pack, le CSV ne garde que l'index
+                        image_data = download_image_bytes(image_url)
+                        row['image_index'] = pack.append(image_data) if image_data else ''
+                    else:
+                        # Remplacer l'URL de l'image par l'image en base64
+                        base64_image = image_to_base64(image_url)
+                        if base64_image:
+                            row['image_url'] = base64_image
+                        else:
+                            row['image_url'] = "Image non trouvée ou erreur"
                 else:
-                    row['image_url'] = "Image non trouvée ou erreur"
-            else:
-                print(f"Pas d'URL d'image trouvée dans la ligne.")
-            writer.writerow(row)
-            time.sleep(1) 
+                    print(f"Pas d'URL d'image trouvée dans la ligne.")
+                writer.writerow(row)
+    finally:
+        if pack:
+            pack.close()
             
 # Exemple d'utilisation
 input_csv = 'mammal_tracks/tracks.csv'  # Nom de votre fichier CSV d'entrée
-output_csv = 'tracks_with_url.csv'  # Nom du fichier CSV de sortie avec les images en base64
+output_csv = 'tracks_with_url.csv'  # Nom du fichier CSV de sortie (métadonnées + index dans le pack)
+pack_path = 'tracks_images.pack'  # Pack binaire contenant les images
 
-update_csv(input_csv, output_csv)
+update_csv(input_csv, output_csv, pack_path=pack_path)
@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from typing import Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+from request_trace import trace_webdriver
+
+DRIVER_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'mammal_tracks', 'chromedriver.json')
+DRIVER_CACHE_MAX_AGE = 7 * 24 * 3600
+CHROME_BINARIES = ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome']
+
+# CDP Network.setBlockedURLs patterns. The scrapers only read DOM attributes
+# and fetch images themselves, so none of these are needed to extract data.
+BLOCK_IMAGES = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.bmp']
+BLOCK_MEDIA = ['*.mp4', '*.webm', '*.ogg', '*.mp3', '*.wav', '*.m4a']
+BLOCK_FONTS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*fonts.googleapis.com*', '*fonts.gstatic.com*']
+# CDP URL blocking cannot express "any host but the page's own", so third-party
+# scripts are matched by the analytics/ads/widget hosts these sites load.
+BLOCK_THIRD_PARTY = [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*facebook.net*', '*connect.facebook.net*',
+    '*hotjar.com*', '*cloudflareinsights.com*', '*stats.wp.com*', '*sentry.io*',
+    '*newrelic.com*', '*nr-data.net*', '*addthis.com*', '*sharethis.com*',
+]
+
+LOAD_PROFILES = {
+    # Everything loads, page_load_strategy 'normal': the historical behaviour
+    'full': {'strategy': 'normal', 'images': True, 'block': []},
+    # Images and CSS kept for pages whose lazy loading depends on layout
+    'layout': {'strategy': 'eager', 'images': True, 'block': BLOCK_MEDIA + BLOCK_FONTS + BLOCK_THIRD_PARTY},
+    # DOM only: no images, media, fonts or third-party scripts
+    'fast': {'strategy': 'eager', 'images': False, 'block': BLOCK_IMAGES + BLOCK_MEDIA + BLOCK_FONTS + BLOCK_THIRD_PARTY},
+}
+
+
+def find_chrome_binary() -> Optional[str]:
+    if sys.platform == 'win32':
+        for root in (os.environ.get('PROGRAMFILES', ''), os.environ.get('PROGRAMFILES(X86)', ''),
+                     os.environ.get('LOCALAPPDATA', '')):
+            path = os.path.join(root, 'Google', 'Chrome', 'Application', 'chrome.exe')
+            if root and os.path.exists(path):
+                return path
+        return None
+    if sys.platform == 'darwin':
+        path = '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
+        return path if os.path.exists(path) else None
+    for name in CHROME_BINARIES:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def chrome_version() -> Optional[str]:
+    """Installed Chrome version, read locally (no network), or None if unknown."""
+    try:
+        if sys.platform == 'win32':
+            output = subprocess.run(
+                ['reg', 'query', r'HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon', '/v', 'version'],
+                capture_output=True, text=True, timeout=5
+            ).stdout
+        else:
+            binary = find_chrome_binary()
+            if not binary:
+                return None
+            output = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'(\d+)\.\d+\.\d+\.\d+', output)
+    return match.group(0) if match else None
+
+
+def resolve_driver_path(cache_file: str = DRIVER_CACHE, max_age: float = DRIVER_CACHE_MAX_AGE) -> str:
+    """chromedriver path, resolved by webdriver-manager at most once per Chrome major version.
+
+    The resolved path is stamped with the Chrome version it was resolved for;
+    it is reused while the file exists, the major version matches and the
+    stamp is younger than `max_age`.
+    """
+    version = chrome_version()
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        same_major = version is None or cached.get('chrome_major') == version.split('.')[0]
+        fresh = time.time() - cached.get('resolved_at', 0) < max_age
+        if same_major and fresh and os.path.exists(cached['path']):
+            return cached['path']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'path': path,
+            'chrome_version': version,
+            'chrome_major': version.split('.')[0] if version else None,
+            'resolved_at': time.time(),
+        }, f)
+    logging.info(f"Resolved chromedriver {path} for Chrome {version}")
+    return path
+
+
+def port_open(port: int, host: str = '127.0.0.1') -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.5)
+        return sock.connect_ex((host, port)) == 0
+
+
+def ensure_debug_browser(port: int = 9222, user_data_dir: Optional[str] = None,
+                         headless: bool = True, timeout: float = 15) -> str:
+    """Start a long-lived Chrome with a remote debugging port unless one is already listening.
+
+    Returns the ``host:port`` debugger address to attach to. The browser is
+    detached from this process so it survives scraper restarts.
+    """
+    address = f"127.0.0.1:{port}"
+    if port_open(port):
+        return address
+    binary = find_chrome_binary()
+    if not binary:
+        raise RuntimeError("Chrome binary not found; start Chrome with --remote-debugging-port manually")
+    user_data_dir = user_data_dir or os.path.join(os.path.expanduser('~'), '.cache', 'mammal_tracks', f'chrome-{port}')
+    args = [binary, f'--remote-debugging-port={port}', f'--user-data-dir={user_data_dir}',
+            '--no-first-run', '--no-default-browser-check']
+    if headless:
+        args.append('--headless=new')
+    subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while not port_open(port):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Chrome did not open debugging port {port}")
+        time.sleep(0.1)
+    return address
+
+
+def configure_load_profile(options: webdriver.ChromeOptions, profile: str):
+    settings = LOAD_PROFILES[profile]
+    options.page_load_strategy = settings['strategy']
+    if not settings['images'] and not options.debugger_address:
+        # Also stop <img> decoding at the content-settings level (launch-time only)
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+
+def apply_load_profile(driver: webdriver.Chrome, profile: str):
+    blocked = LOAD_PROFILES[profile]['block']
+    if blocked:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked})
+
+
+def create_chrome_driver(options: webdriver.ChromeOptions, debugger_address: Optional[str] = None,
+                         load_profile: str = 'full') -> webdriver.Chrome:
+    """Chrome driver using the cached chromedriver path.
+
+    With `debugger_address`, attach to an already running browser instead of
+    launching a new one (launch-time arguments such as --headless are then
+    ignored by Chrome). `load_profile` is one of LOAD_PROFILES.
+    """
+    if debugger_address:
+        options.debugger_address = debugger_address
+    configure_load_profile(options, load_profile)
+    driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=options)
+    apply_load_profile(driver, load_profile)
+    return trace_webdriver(driver)
@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+import requests
+
+from request_trace import TracingHTTPAdapter
+
+
+class CachingHTTPAdapter(TracingHTTPAdapter):
+    """Transport adapter caching GET responses that carry ETag or Last-Modified.
+
+    Cached URLs are revalidated with If-None-Match / If-Modified-Since; a 304
+    is turned back into a 200 carrying the cached body, marked with
+    ``response.from_cache = True``. Image bodies go to the ImageStore objects
+    when a store is given (so they exist once on disk), other bodies to
+    ``<cache_dir>/bodies``; both are content-addressed and the digest is
+    exposed as ``response.cache_digest``. Bodies kept under ``bodies`` also
+    get ``response.cache_path``, so callers can hard-link the file instead of
+    writing a second copy. Streaming requests (``stream=True``) bypass the
+    cache.
+    """
+
+    def __init__(self, cache_dir: str = 'data/http_cache', store=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, 'bodies')
+        self.store = store
+        os.makedirs(self.bodies_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                digest TEXT NOT NULL,
+                in_store INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def body_path(self, digest: str, in_store: bool) -> str:
+        if in_store:
+            return self.store.path(digest)
+        return os.path.join(self.bodies_dir, digest[:2], digest)
+
+    def lookup(self, url: str) -> Optional[dict]:
+        with self.lock:
+            row = self.db.execute(
+                'SELECT etag, last_modified, content_type, digest, in_store FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+        if not row:
+            return None
+        entry = dict(zip(('etag', 'last_modified', 'content_type', 'digest', 'in_store'), row))
+        if entry['in_store'] and self.store is None:
+            return None
+        if not os.path.exists(self.body_path(entry['digest'], entry['in_store'])):
+            return None
+        return entry
+
+    def save(self, url: str, response: requests.Response) -> str:
+        content_type = response.headers.get('Content-Type', '')
+        in_store = self.store is not None and content_type.startswith('image/')
+        if in_store:
+            digest, _ = self.store.write_object([response.content])
+        else:
+            digest = hashlib.sha256(response.content).hexdigest()
+            path = self.body_path(digest, False)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix='.body-', dir=os.path.dirname(path))
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(response.content)
+                os.replace(tmp_path, path)
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 content_type, digest, int(in_store), time.time())
+            )
+            self.db.commit()
+        return digest
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET' or kwargs.get('stream'):
+            return super().send(request, **kwargs)
+        entry = self.lookup(request.url)
+        if entry:
+            if entry['etag']:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+        response = super().send(request, **kwargs)
+        response.from_cache = False
+        response.cache_digest = None
+        response.cache_path = None
+        in_store = False
+
+        if response.status_code == 304 and entry:
+            response.content  # drain the empty body so the connection goes back to the pool
+            with open(self.body_path(entry['digest'], entry['in_store']), 'rb') as f:
+                response._content = f.read()
+            response.status_code = 200
+            response.reason = 'OK'
+            if entry['content_type']:
+                response.headers['Content-Type'] = entry['content_type']
+            response.from_cache = True
+            response.cache_digest = entry['digest']
+            in_store = entry['in_store']
+        elif response.status_code == 200 and (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+            response.cache_digest = self.save(request.url, response)
+            in_store = self.store is not None and response.headers.get('Content-Type', '').startswith('image/')
+        if response.cache_digest and not in_store:
+            response.cache_path = self.body_path(response.cache_digest, False)
+        return response
+
+    def close(self):
+        super().close()
+        with self.lock:
+            self.db.close()
+
+
+def install_http_cache(session: requests.Session, cache_dir: str = 'data/http_cache',
+                       store=None) -> CachingHTTPAdapter:
+    adapter = CachingHTTPAdapter(cache_dir, store)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return adapter
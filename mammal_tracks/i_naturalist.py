@@ -1,33 +1,118 @@
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+import argparse
+import itertools
 import os
-import time
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from urllib.parse import urljoin
 import logging
 from dataclasses import dataclass
-from typing import Set, Optional
+from typing import Dict, Optional
+
+from checkpoint import CrawlCheckpoint
+from driver_setup import create_chrome_driver, ensure_debug_browser
+from image_store import ImageStore
+from inaturalist_api import API_URL, INaturalistApiClient
+from metrics import BYTES, IMAGES, PAGES, QUEUE_DEPTH, RETRIES, instrument_session, selenium_wait, start_metrics_server
+from phash_index import PerceptualIndex
+from rate_limit import HostRateLimiter
+from request_trace import retry_attempt, trace_session
+from seen_urls import SeenUrlIndex
+
+# Async script: scroll to the bottom, then resolve once the page has been quiet
+# (no DOM mutation, no fetch/XHR in flight) for `quietMs`, or after `capMs`.
+SCROLL_SETTLE_JS = """
+    const [quietMs, capMs, done] = arguments;
+    if (!window.__trkInflight) {
+        window.__trkInflight = {count: 0};
+        const inflight = window.__trkInflight;
+        const originalFetch = window.fetch;
+        window.fetch = function () {
+            inflight.count++;
+            return originalFetch.apply(this, arguments).finally(() => inflight.count--);
+        };
+        const originalSend = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.send = function () {
+            inflight.count++;
+            this.addEventListener('loadend', () => inflight.count--, {once: true});
+            return originalSend.apply(this, arguments);
+        };
+    }
+    const start = performance.now();
+    const startHeight = document.body.scrollHeight;
+    const startPhotos = document.querySelectorAll('.photo.has-photo').length;
+    let lastChange = start;
+    const observer = new MutationObserver(() => { lastChange = performance.now(); });
+    observer.observe(document.body, {childList: true, subtree: true});
+    window.scrollTo(0, document.body.scrollHeight);
+    const timer = setInterval(() => {
+        const now = performance.now();
+        const idle = window.__trkInflight.count === 0 && now - lastChange >= quietMs;
+        const capped = now - start >= capMs;
+        if (!idle && !capped) return;
+        clearInterval(timer);
+        observer.disconnect();
+        done({
+            grew: document.body.scrollHeight > startHeight,
+            photos: document.querySelectorAll('.photo.has-photo').length - startPhotos,
+            elapsed: now - start,
+            capped: capped && !idle,
+        });
+    }, 50);
+"""
 
 @dataclass
 class ScraperConfig:
     base_url: str = 'https://www.inaturalist.org/observations'
+    source: str = 'browser'  # 'browser' (Selenium UI) or 'api' (observations JSON API, no Chrome)
+    api_url: str = API_URL
+    api_all_photos: bool = False  # api source: every photo of an observation, not only the one the UI grid shows
     download_dir: str = './data/i_naturalist'
     log_file: str = 'downloaded_images.txt'
-    request_delay: float = 2.0
-    scroll_delay: float = 1.0
+    seen_index: str = 'data/seen_urls'
+    store_dir: Optional[str] = None
+    phash_index_path: Optional[str] = None
+    phash_radius: int = 6
+    host_rate: float = 0.5
+    host_burst: int = 3
+    host_rate_overrides: Optional[Dict[str, float]] = None
+    # Photo downloads hit the CDN hosts, not inaturalist.org: separate, higher per-host rate
+    image_rate: float = 4.0
+    image_burst: int = 8
+    scroll_quiet: float = 0.3  # seconds without DOM mutation or pending request before a scroll step is settled
+    scroll_timeout: float = 10.0  # hard cap per scroll step
+    max_scroll_steps: int = 200
     page_load_timeout: int = 10
     headless: bool = False
+    debugger_port: Optional[int] = None  # attach to a long-lived Chrome on this port
+    load_profile: str = 'fast'  # 'fast', 'layout' (keeps images for lazy loading) or 'full'
+    workers: int = 1  # >1: pool of Chrome instances crawling pages in parallel
+    download_workers: int = 4  # pool mode: threads downloading photos while the browsers load pages
+    checkpoint_path: Optional[str] = None  # defaults to data/checkpoints/i_naturalist_<source>.json
+    checkpoint_interval: float = 5.0
+    resume: bool = False  # continue from the checkpoint of an interrupted run
+    metrics_port: Optional[int] = None  # /metrics port, default SCRAPER_METRICS_PORT or 9108; 0 disables
 
 class MammalTrackScraper:
     def __init__(self, config: ScraperConfig):
         self.config = config
-        self.downloaded_images: Set[str] = set()
+        self.downloaded_images: Optional[SeenUrlIndex] = None
+        self.rate_limiter = HostRateLimiter.from_config(config)
+        self.image_rate_limiter = HostRateLimiter(config.image_rate, config.image_burst, config.host_rate_overrides)
+        self.download_executor: Optional[ThreadPoolExecutor] = None
+        self.session = trace_session(instrument_session(requests.Session(), 'inaturalist'))
+        self.driver = None
         self.setup_logging()
-        self.setup_driver()
+        checkpoint_path = config.checkpoint_path or f'data/checkpoints/i_naturalist_{config.source}.json'
+        self.checkpoint = CrawlCheckpoint(checkpoint_path, config.resume, config.checkpoint_interval)
+        if config.source == 'browser':
+            self.setup_driver()
         self.setup_storage()
 
     def setup_logging(self):
@@ -41,32 +126,56 @@ class MammalTrackScraper:
         )
 
     def setup_driver(self):
+        self.driver = self.create_driver()
+
+    def create_driver(self, headless: Optional[bool] = None, attach: bool = True):
+        headless = self.config.headless if headless is None else headless
         options = webdriver.ChromeOptions()
-        if self.config.headless:
+        if headless:
             options.add_argument('--headless')
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=options
-        )
+        debugger_address = None
+        if attach and self.config.debugger_port:
+            debugger_address = ensure_debug_browser(self.config.debugger_port, headless=headless)
+        return create_chrome_driver(options, debugger_address, self.config.load_profile)
 
     def setup_storage(self):
         os.makedirs(self.config.download_dir, exist_ok=True)
+        self.store = ImageStore(self.config.store_dir) if self.config.store_dir else None
+        self.phash_index = None
+        if self.config.phash_index_path:
+            self.phash_index = PerceptualIndex(self.config.phash_index_path, self.config.phash_radius)
+        self.downloaded_images = SeenUrlIndex(self.config.seen_index)
         if os.path.exists(self.config.log_file):
-            with open(self.config.log_file, 'r') as f:
-                self.downloaded_images.update(f.read().splitlines())
+            # One-time migration from the legacy text log, even if another scraper filled the index first
+            def legacy_urls():
+                with open(self.config.log_file, 'r') as f:
+                    return [line.strip() for line in f if line.strip()]
+            self.downloaded_images.import_once(f"inaturalist:{os.path.abspath(self.config.log_file)}", legacy_urls)
 
     def get_search_url(self, page: int) -> str:
         return f"{self.config.base_url}?photos&q=track&iconic_taxa=Mammalia&page={page}"
 
-    def scroll_page(self):
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-        while True:
-            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(self.config.scroll_delay)
-            new_height = self.driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
+    def scroll_page(self, driver=None):
+        """Scroll until a step neither grows the page nor adds thumbnails.
+
+        Each step waits for the page to settle rather than a fixed delay, so
+        scrolling takes as long as the content actually needs to load.
+        """
+        driver = driver or self.driver
+        driver.set_script_timeout(self.config.scroll_timeout + 5)
+        quiet_ms = self.config.scroll_quiet * 1000
+        cap_ms = self.config.scroll_timeout * 1000
+        for step in range(self.config.max_scroll_steps):
+            try:
+                result = driver.execute_async_script(SCROLL_SETTLE_JS, quiet_ms, cap_ms)
+            except TimeoutException:
+                logging.warning("Scroll probe timed out, keeping what is loaded")
+                return
+            if result['capped']:
+                logging.warning(f"Scroll step {step + 1} hit the {self.config.scroll_timeout}s cap")
+            if not result['grew'] and not result['photos']:
+                return
+            logging.debug(f"Scroll step {step + 1}: +{result['photos']} photos in {result['elapsed']:.0f} ms")
 
     def extract_image_url(self, element) -> Optional[str]:
         style = element.get_attribute('style')
@@ -74,6 +183,24 @@ class MammalTrackScraper:
             return style.split('url("')[1].split('")')[0]
         return None
 
+    def thumbnail_url(self, url: str) -> str:
+        return re.sub(r'/(small|medium|large|original)\.', '/square.', url)
+
+    def is_near_duplicate(self, url: str) -> bool:
+        """Hash the square thumbnail before downloading the full-size photo."""
+        thumb = self.thumbnail_url(url)
+        self.image_rate_limiter.acquire(thumb)
+        value, _ = self.phash_index.check_url(self.session, thumb)
+        if value is None:
+            return False
+        duplicate_of = self.phash_index.claim(value, url)
+        if duplicate_of:
+            logging.info(f"Skipping near-duplicate {url} (matches {duplicate_of})")
+            IMAGES.labels('inaturalist', 'duplicate').inc()
+            self.downloaded_images.add(url)
+            return True
+        return False
+
     def extract_animal_name(self, photo_element) -> str:
         try:
             parent_div = photo_element.find_element(
@@ -89,63 +216,214 @@ class MammalTrackScraper:
             logging.warning(f"Could not extract animal name: {e}")
             return "unknown_animal"
 
-    def download_image(self, url: str, file_path: str):
+    def download_image(self, url: str, file_path: Optional[str], species: Optional[str] = None) -> bool:
         try:
-            response = requests.get(url, timeout=10)
+            self.image_rate_limiter.acquire(url)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
+            BYTES.labels('inaturalist').inc(len(response.content))
             
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
+            if self.store:
+                digest = self.store.put(response.content, 'inaturalist', url, species)
+                file_path = self.store.path(digest)
+            else:
+                with open(file_path, 'wb') as f:
+                    f.write(response.content)
             
             self.downloaded_images.add(url)
-            with open(self.config.log_file, 'a') as f:
-                f.write(url + '\n')
             
             logging.info(f"Successfully downloaded: {file_path}")
-            time.sleep(self.config.request_delay)
+            IMAGES.labels('inaturalist', 'ok').inc()
+            return True
             
         except requests.exceptions.RequestException as e:
             logging.error(f"Failed to download {url}: {e}")
+            IMAGES.labels('inaturalist', 'failed').inc()
+            if self.phash_index:
+                self.phash_index.release(url)  # a retry must not find its own hash
+            return False
 
-    def process_page(self, page_number: int) -> bool:
-        self.driver.get(self.get_search_url(page_number))
-        self.scroll_page()
+    def process_page(self, page_number: int, driver=None) -> bool:
+        driver = driver or self.driver
+        search_url = self.get_search_url(page_number)
+        self.rate_limiter.acquire(search_url)
+        with selenium_wait('inaturalist', 'page_load'):
+            driver.get(search_url)
+        with selenium_wait('inaturalist', 'scroll'):
+            self.scroll_page(driver)
 
         try:
-            WebDriverWait(self.driver, self.config.page_load_timeout).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, '.photo.has-photo'))
-            )
+            with selenium_wait('inaturalist', 'photos'):
+                WebDriverWait(driver, self.config.page_load_timeout).until(
+                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, '.photo.has-photo'))
+                )
         except Exception as e:
             logging.info(f"No more images found on page {page_number}")
             return False
 
-        photo_elements = self.driver.find_elements(By.CSS_SELECTOR, '.photo.has-photo')
+        photo_elements = driver.find_elements(By.CSS_SELECTOR, '.photo.has-photo')
+        queued = QUEUE_DEPTH.labels('inaturalist', 'page_photos')
+        queued.inc(len(photo_elements))
         
         for i, photo_element in enumerate(photo_elements):
+            queued.dec()
             image_url = self.extract_image_url(photo_element)
-            if not image_url or image_url in self.downloaded_images:
+            if not self.should_download(image_url):
                 continue
 
             animal_name = self.extract_animal_name(photo_element)
-            file_name = f"{page_number}_{i + 1}_{animal_name}.jpg"
+            self.save_image(image_url, animal_name, f"{page_number}_{i + 1}_{animal_name}.jpg")
+
+        self.checkpoint.complete_page(page_number)
+        PAGES.labels('inaturalist').inc()
+        return True
+
+    def should_download(self, image_url: Optional[str]) -> bool:
+        if not image_url:
+            return False
+        if image_url in self.downloaded_images:
+            IMAGES.labels('inaturalist', 'skipped').inc()
+            return False
+        if self.phash_index and self.is_near_duplicate(image_url):
+            return False
+        return True
+
+    def save_image(self, image_url: str, animal_name: str, file_name: str):
+        file_path = None
+        if not self.store:
             species_dir = os.path.join(self.config.download_dir, animal_name)
             os.makedirs(species_dir, exist_ok=True)
             file_path = os.path.join(species_dir, file_name)
-            
-            self.download_image(image_url, file_path)
+        
+        # Pending before the download starts, so a crash mid-download leaves it to retry_pending
+        self.checkpoint.add_pending(image_url, {'species': animal_name, 'file_name': file_name})
+        if self.download_executor:
+            future = self.download_executor.submit(self.finish_download, image_url, file_path, animal_name)
+            future.add_done_callback(self.log_download_error)
+        else:
+            self.finish_download(image_url, file_path, animal_name)
 
-        return True
+    def finish_download(self, image_url: str, file_path: Optional[str], animal_name: str):
+        if self.download_image(image_url, file_path, animal_name):
+            self.checkpoint.done(image_url)
+
+    @staticmethod
+    def log_download_error(future):
+        if future.exception():
+            logging.error(f"Download failed: {future.exception()}")
+
+    def retry_pending(self):
+        """Downloads that were started but not finished by the interrupted run."""
+        for url, meta in self.checkpoint.pending().items():
+            if url in self.downloaded_images:
+                self.checkpoint.done(url)
+            else:
+                RETRIES.labels('inaturalist').inc()
+                with retry_attempt(1):
+                    self.save_image(url, meta['species'], meta['file_name'])
+
+    def run_api(self):
+        """Same records as the browser crawl, read from the observations API."""
+        client = INaturalistApiClient(self.config.api_url, session=self.session, rate_limiter=self.rate_limiter,
+                                      all_photos=self.config.api_all_photos)
+        current = None
+        for photo in client.iter_photos(self.checkpoint.cursor or 0):
+            if photo.observation_id != current:
+                # Every photo of the previous observation has been handled
+                if current is not None:
+                    self.checkpoint.set_cursor(current)
+                current = photo.observation_id
+            if self.should_download(photo.url):
+                file_name = f"{photo.observation_id}_{photo.position + 1}_{photo.species}.jpg"
+                self.save_image(photo.url, photo.species, file_name)
+
+    def crawl_worker(self, driver, pages, next_page_lock, done: threading.Event):
+        try:
+            while not done.is_set():
+                with next_page_lock:
+                    page_number = next(pages)
+                if not self.process_page(page_number, driver):
+                    # Empty page: no higher page will have results either
+                    done.set()
+        except Exception as e:
+            logging.error(f"Worker stopped on error: {e}")
+            self._worker_errors.append(e)
+            done.set()
+        finally:
+            if driver is not self.driver:
+                driver.quit()
+
+    def run_parallel(self, workers: int):
+        """Crawl pages with a pool of headless browsers sharing one page counter.
+
+        Pages are handed out in increasing order, so every page below the first
+        empty one has already been claimed when the stop flag is raised. Photos
+        are downloaded by a separate thread pool (download_workers) limited by
+        the CDN rate (image_rate), so the page workers only wait on page loads.
+        """
+        pages = (page for page in itertools.count(1) if not self.checkpoint.is_page_done(page))
+        next_page_lock = threading.Lock()
+        done = threading.Event()
+        self._worker_errors = []
+        drivers = [self.driver]
+        try:
+            for _ in range(workers - 1):
+                drivers.append(self.create_driver(headless=True, attach=False))
+        except Exception:
+            for driver in drivers[1:]:
+                driver.quit()
+            raise
+        threads = [
+            threading.Thread(target=self.crawl_worker, args=(driver, pages, next_page_lock, done),
+                             name=f"crawl-{i}")
+            for i, driver in enumerate(drivers)
+        ]
+        self.download_executor = ThreadPoolExecutor(self.config.download_workers, thread_name_prefix='download')
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.download_executor.shutdown(wait=True)
+            self.download_executor = None
+        if self._worker_errors:
+            # Keep the checkpoint: the pages after the failure were never crawled
+            raise self._worker_errors[0]
 
     def run(self):
+        start_metrics_server(self.config.metrics_port)
         try:
-            page_number = 1
-            while self.process_page(page_number):
-                page_number += 1
+            self.retry_pending()
+            if self.config.source == 'api':
+                self.run_api()
+            elif self.config.workers > 1:
+                self.run_parallel(self.config.workers)
+            else:
+                page_number = self.checkpoint.first_incomplete_page()
+                while self.process_page(page_number):
+                    page_number = self.checkpoint.first_incomplete_page(page_number + 1)
+            if self.checkpoint.pending():
+                # Failed downloads: keep the checkpoint so that --resume retries them
+                logging.warning(f"{len(self.checkpoint.pending())} downloads failed, rerun with --resume")
+            else:
+                self.checkpoint.finish()
         finally:
-            self.driver.quit()
+            self.checkpoint.sync()
+            if self.driver:
+                self.driver.quit()
+            self.downloaded_images.close()
 
 def main():
-    config = ScraperConfig()
+    parser = argparse.ArgumentParser(description="Download mammal track photos from iNaturalist")
+    parser.add_argument('--resume', action='store_true', help="continue the interrupted crawl from its checkpoint")
+    parser.add_argument('--source', choices=['browser', 'api'], default='browser')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--all-photos', action='store_true',
+                        help="api source: download every photo of an observation, not only the first")
+    args = parser.parse_args()
+    config = ScraperConfig(source=args.source, workers=args.workers, resume=args.resume,
+                           api_all_photos=args.all_photos)
     scraper = MammalTrackScraper(config)
     scraper.run()
 
@@ -0,0 +1,106 @@
+import mmap
+import os
+import struct
+from typing import Iterator
+
+INDEX_MAGIC = b'TRKPACK1'
+INDEX_ENTRY = struct.Struct('<QQ')  # offset, length
+
+
+def index_path_for(pack_path: str) -> str:
+    return os.path.splitext(pack_path)[0] + '.idx'
+
+
+class ImagePackWriter:
+    """Append-only image container: raw bytes in ``.pack``, (offset, length) pairs in ``.idx``.
+
+    Data is flushed before its index entry, so a crash can leave unreferenced
+    bytes at the end of the pack but never an entry pointing past it. With
+    ``reset=True`` an existing pack is emptied first, for a CSV that is
+    rewritten from scratch along with it.
+    """
+
+    def __init__(self, pack_path: str, reset: bool = False):
+        self.pack_path = pack_path
+        self.index_path = index_path_for(pack_path)
+        mode = 'wb' if reset else 'ab'
+        self.data = open(pack_path, mode)
+        self.index = open(self.index_path, mode)
+        if self.index.tell() == 0:
+            self.index.write(INDEX_MAGIC)
+            self.index.flush()
+        self.count = (self.index.tell() - len(INDEX_MAGIC)) // INDEX_ENTRY.size
+        self.data.seek(0, os.SEEK_END)
+
+    def append(self, blob: bytes) -> int:
+        """Store one image and return its index in the pack."""
+        offset = self.data.tell()
+        self.data.write(blob)
+        self.data.flush()
+        self.index.write(INDEX_ENTRY.pack(offset, len(blob)))
+        self.index.flush()
+        self.count += 1
+        return self.count - 1
+
+    def close(self):
+        for f in (self.data, self.index):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ImagePackReader:
+    """Memory-mapped reader; ``pack[n]`` is a zero-copy memoryview of image n."""
+
+    def __init__(self, pack_path: str):
+        self.pack_path = pack_path
+        self.index_path = index_path_for(pack_path)
+        with open(self.index_path, 'rb') as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"{self.index_path} is not an image pack index")
+        self._data_file = open(pack_path, 'rb')
+        self._index_file = open(self.index_path, 'rb')
+        self._data = self._map(self._data_file)
+        self._index = self._map(self._index_file)
+        self._count = (len(self._index) - len(INDEX_MAGIC)) // INDEX_ENTRY.size
+
+    @staticmethod
+    def _map(f):
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def entry(self, n: int):
+        if not 0 <= n < self._count:
+            raise IndexError(n)
+        return INDEX_ENTRY.unpack_from(self._index, len(INDEX_MAGIC) + n * INDEX_ENTRY.size)
+
+    def __getitem__(self, n: int) -> memoryview:
+        offset, length = self.entry(n)
+        return memoryview(self._data)[offset:offset + length]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for n in range(self._count):
+            yield self[n]
+
+    def close(self):
+        for m in (self._data, self._index):
+            if isinstance(m, mmap.mmap):
+                m.close()
+        self._data_file.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
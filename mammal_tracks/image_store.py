@@ -0,0 +1,135 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+@dataclass
+class StoredImage:
+    source: str
+    url: str
+    species: Optional[str]
+    digest: str
+    size: int
+
+
+class ImageStore:
+    """Content-addressed image store shared by every scraper.
+
+    Bytes live once under ``objects/<aa>/<bb>/<sha256>``; ``index.sqlite``
+    maps (source, url) to the digest together with the species label.
+    """
+
+    def __init__(self, root: str = 'data/store', fanout: int = 2):
+        self.root = root
+        self.fanout = fanout
+        self.objects_dir = os.path.join(root, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, 'index.sqlite'), check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                source TEXT NOT NULL,
+                url TEXT NOT NULL,
+                species TEXT,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (source, url)
+            )
+        """)
+        self.db.execute('CREATE INDEX IF NOT EXISTS images_digest ON images (digest)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS images_species ON images (species)')
+        self.db.commit()
+
+    def path(self, digest: str) -> str:
+        shards = [digest[2 * i:2 * i + 2] for i in range(self.fanout)]
+        return os.path.join(self.objects_dir, *shards, digest)
+
+    def contains(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, data: bytes, source: str, url: str, species: Optional[str] = None) -> str:
+        return self.put_stream([data], source, url, species)
+
+    def put_stream(self, chunks: Iterable[bytes], source: str, url: str,
+                   species: Optional[str] = None) -> str:
+        digest, size = self.write_object(chunks)
+        self.record(source, url, species, digest, size)
+        return digest
+
+    def write_object(self, chunks: Iterable[bytes]) -> Tuple[str, int]:
+        """Hash while writing to a temp file, then publish it under its digest.
+
+        If the digest is already present the temp file is discarded, so
+        identical bytes are never stored twice. Nothing is added to the index.
+        """
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix='.incoming-', dir=self.objects_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if chunk:
+                        sha.update(chunk)
+                        size += len(chunk)
+                        f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            digest = sha.hexdigest()
+            final_path = self.path(digest)
+            if os.path.exists(final_path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest, size
+
+    def record(self, source: str, url: str, species: Optional[str], digest: str, size: int):
+        with self.lock:
+            self.db.execute(
+                """INSERT INTO images (source, url, species, digest, size, stored_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (source, url) DO UPDATE SET
+                       species = excluded.species,
+                       digest = excluded.digest,
+                       size = excluded.size,
+                       stored_at = excluded.stored_at""",
+                (source, url, species, digest, size, time.time())
+            )
+            self.db.commit()
+
+    def lookup(self, source: str, url: str) -> Optional[str]:
+        with self.lock:
+            row = self.db.execute(
+                'SELECT digest FROM images WHERE source = ? AND url = ?', (source, url)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get(self, digest: str) -> bytes:
+        with open(self.path(digest), 'rb') as f:
+            return f.read()
+
+    def records(self, species: Optional[str] = None) -> Iterator[StoredImage]:
+        query = 'SELECT source, url, species, digest, size FROM images'
+        params = ()
+        if species is not None:
+            query += ' WHERE species = ?'
+            params = (species,)
+        with self.lock:
+            rows = self.db.execute(query, params).fetchall()
+        for row in rows:
+            yield StoredImage(*row)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
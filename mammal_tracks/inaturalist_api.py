@@ -0,0 +1,86 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import requests
+
+API_URL = 'https://api.inaturalist.org/v1/observations'
+MAX_PER_PAGE = 200
+
+
+@dataclass
+class ObservationPhoto:
+    observation_id: int
+    position: int
+    species: str
+    url: str
+
+
+class INaturalistApiClient:
+    """Pure-HTTP source for the observations the Selenium scraper renders.
+
+    Uses the same filters as the web UI (q=track, iconic_taxa=Mammalia,
+    photos) and walks results with ``id_above`` cursor pagination, which
+    stays cheap at any depth, unlike ``page=N``. Like the UI grid, which
+    shows one photo per observation, only the first photo is yielded unless
+    ``all_photos`` is set.
+    """
+
+    def __init__(self, api_url: str = API_URL, session: Optional[requests.Session] = None,
+                 per_page: int = MAX_PER_PAGE, photo_size: str = 'medium', rate_limiter=None,
+                 all_photos: bool = False):
+        self.api_url = api_url
+        self.session = session or requests.Session()
+        self.per_page = min(per_page, MAX_PER_PAGE)
+        self.photo_size = photo_size
+        self.rate_limiter = rate_limiter
+        self.all_photos = all_photos
+
+    def search_params(self, id_above: int) -> dict:
+        return {
+            'q': 'track',
+            'iconic_taxa': 'Mammalia',
+            'photos': 'true',
+            'order_by': 'id',
+            'order': 'asc',
+            'id_above': id_above,
+            'per_page': self.per_page,
+        }
+
+    def iter_observations(self, id_above: int = 0) -> Iterator[dict]:
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(self.api_url)
+            response = self.session.get(self.api_url, params=self.search_params(id_above), timeout=30)
+            response.raise_for_status()
+            results = response.json().get('results', [])
+            if not results:
+                return
+            for observation in results:
+                yield observation
+            id_above = results[-1]['id']
+            logging.info(f"Fetched {len(results)} observations, cursor id_above={id_above}")
+
+    def species_name(self, observation: dict) -> str:
+        taxon = observation.get('taxon') or {}
+        name = taxon.get('preferred_common_name') or taxon.get('name') or 'unknown_animal'
+        return name.replace(' ', '_').lower()
+
+    def photo_url(self, photo: dict) -> Optional[str]:
+        url = photo.get('url')
+        if not url:
+            return None
+        # The API returns the square thumbnail; the UI grid shows the same photo at another size
+        return re.sub(r'/square\.', f'/{self.photo_size}.', url)
+
+    def iter_photos(self, id_above: int = 0) -> Iterator[ObservationPhoto]:
+        for observation in self.iter_observations(id_above):
+            species = self.species_name(observation)
+            photos = observation.get('photos') or []
+            if not self.all_photos:
+                photos = photos[:1]
+            for position, photo in enumerate(photos):
+                url = self.photo_url(photo)
+                if url:
+                    yield ObservationPhoto(observation['id'], position, species, url)
@@ -1,18 +1,54 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import requests
 import os
+import sys
 import logging
+import tempfile
 from dataclasses import dataclass
-from typing import List, Optional
-import time
+from typing import Dict, List, Optional
 from urllib.parse import urljoin
 import re
 
+# The shared scraper modules (crawl_frontier, rate_limit, image_store...) live in the parent
+# directory, so both `python nature_tracking.py` from this directory and
+# `python -m mammal_tracks.nature_tracking` from the parent work.
+_SHARED_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SHARED_DIR not in sys.path:
+    sys.path.insert(0, _SHARED_DIR)
+
+from crawl_frontier import CrawlConfig, CrawlFrontier
+from http_cache import install_http_cache
+from image_store import ImageStore
+from metrics import BYTES, IMAGES, PAGES, QUEUE_DEPTH, instrument_session, start_metrics_server
+from rate_limit import HostRateLimiter
+from request_trace import trace_session
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+SCRAPER = 'naturetracking_guides'  # Prometheus label
+
+# Only the nodes each handler reads are built into the tree
+GUIDE_NODES = SoupStrainer('article')
+TRACK_ENTRY_NODES = SoupStrainer('div', class_='track-entry')
+
 @dataclass
 class ScraperConfig:
     base_url: str = 'https://naturetracking.com'
     download_dir: str = 'nature_tracking_data'
-    request_delay: float = 2.0
+    store_dir: Optional[str] = None
+    http_cache_dir: Optional[str] = 'data/http_cache'  # None disables conditional revalidation
+    crawl_concurrency: int = 8
+    crawl_max_depth: int = 2
+    crawl_max_pages: int = 500
+    respect_robots: bool = True
+    metrics_port: Optional[int] = None  # /metrics port, default SCRAPER_METRICS_PORT or 9108; 0 disables
+    host_rate: float = 0.5
+    host_burst: int = 3
+    host_rate_overrides: Optional[Dict[str, float]] = None
     headers: dict = None
 
     def __post_init__(self):
@@ -27,8 +63,11 @@ class NatureTrackingScraper:
         self.config = config
         self.setup_logging()
         self.setup_storage()
-        self.session = requests.Session()
+        self.rate_limiter = HostRateLimiter.from_config(config)
+        self.session = trace_session(instrument_session(requests.Session(), SCRAPER))
         self.session.headers.update(self.config.headers)
+        if self.config.http_cache_dir:
+            install_http_cache(self.session, self.config.http_cache_dir, self.store)
 
     def setup_logging(self):
         logging.basicConfig(
@@ -42,40 +81,106 @@ class NatureTrackingScraper:
 
     def setup_storage(self):
         os.makedirs(self.config.download_dir, exist_ok=True)
+        self.store = ImageStore(self.config.store_dir) if self.config.store_dir else None
+
+    def fetch(self, url: str) -> Optional[requests.Response]:
+        try:
+            self.rate_limiter.acquire(url)
+            response = self.session.get(url, timeout=30)
+            if not getattr(response, 'from_cache', False):
+                BYTES.labels(SCRAPER).inc(len(response.content))
+            return response
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error fetching {url}: {e}")
+            return None
 
-    def get_page_content(self, url: str) -> Optional[BeautifulSoup]:
+    def parse(self, html: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+        return BeautifulSoup(html, HTML_PARSER, parse_only=parse_only)
+
+    def get_page_content(self, url: str, parse_only: Optional[SoupStrainer] = None) -> Optional[BeautifulSoup]:
+        response = self.fetch(url)
+        if response is None:
+            return None
         try:
-            response = self.session.get(url)
             response.raise_for_status()
-            return BeautifulSoup(response.text, 'html.parser')
         except requests.exceptions.RequestException as e:
             logging.error(f"Error fetching {url}: {e}")
             return None
+        return self.parse(response.text, parse_only)
 
-    def download_image(self, url: str, filename: str):
+    def download_image(self, url: str, filename: str, species: Optional[str] = None):
         try:
             full_url = urljoin(self.config.base_url, url)
+            self.rate_limiter.acquire(full_url)
             response = self.session.get(full_url)
             response.raise_for_status()
             
+            digest = getattr(response, 'cache_digest', None)
+            unchanged = getattr(response, 'from_cache', False)
             file_path = os.path.join(self.config.download_dir, filename)
-            with open(file_path, 'wb') as f:
-                f.write(response.content)
+            if self.store and digest and self.store.contains(digest):
+                # The HTTP cache already holds these bytes in the store
+                self.store.record('naturetracking_guides', full_url, species, digest, len(response.content))
+            elif unchanged and not self.store and os.path.exists(file_path):
+                pass
+            elif self.store:
+                self.store.put(response.content, 'naturetracking_guides', full_url, species)
+            elif not self.link_cached_body(response, file_path):
+                self.write_copy(file_path, response.content)
             
-            logging.info(f"Successfully downloaded: {filename}")
-            time.sleep(self.config.request_delay)
+            if unchanged:
+                logging.info(f"Not modified, kept cached copy: {filename}")
+                IMAGES.labels(SCRAPER, 'unchanged').inc()
+            else:
+                logging.info(f"Successfully downloaded: {filename}")
+                BYTES.labels(SCRAPER).inc(len(response.content))
+                IMAGES.labels(SCRAPER, 'ok').inc()
             
         except requests.exceptions.RequestException as e:
             logging.error(f"Failed to download {url}: {e}")
+            IMAGES.labels(SCRAPER, 'failed').inc()
+
+    @staticmethod
+    def link_cached_body(response: requests.Response, file_path: str) -> bool:
+        """Hard-link file_path to the HTTP cache's copy of the body instead of writing it again."""
+        cache_path = getattr(response, 'cache_path', None)
+        if not cache_path:
+            return False
+        tmp_path = f"{file_path}.link"
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            os.link(cache_path, tmp_path)
+            os.replace(tmp_path, file_path)
+            return True
+        except OSError:
+            return False  # other filesystem, or links unsupported: write a copy
+
+    @staticmethod
+    def write_copy(file_path: str, content: bytes):
+        """Write through a new file: file_path may be a hard link to a cache body, which must not be truncated."""
+        fd, tmp_path = tempfile.mkstemp(prefix='.download-', dir=os.path.dirname(file_path) or '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
 
     def sanitize_filename(self, filename: str) -> str:
         return re.sub(r'[^\w\-_.]', '_', filename)
 
     def scrape_tracking_guides(self):
-        soup = self.get_page_content(self.config.base_url)
-        if not soup:
-            return
+        soup = self.get_page_content(self.config.base_url, GUIDE_NODES)
+        if soup:
+            self.process_guides(soup, self.config.base_url)
+
+    def handle_tracking_guides(self, page_url: str, html: str):
+        PAGES.labels(SCRAPER).inc()
+        self.process_guides(self.parse(html, GUIDE_NODES), page_url)
 
+    def process_guides(self, soup: BeautifulSoup, page_url: str):
         # Find and process tracking guides
         guide_elements = soup.find_all('article')
         for guide in guide_elements:
@@ -95,17 +200,22 @@ class NatureTrackingScraper:
                 for i, img in enumerate(images):
                     if img.get('src'):
                         img_filename = self.sanitize_filename(f"{title}_image_{i+1}{os.path.splitext(img['src'])[1]}")
-                        self.download_image(img['src'], img_filename)
+                        self.download_image(urljoin(page_url, img['src']), img_filename, species=title)
 
             except Exception as e:
                 logging.error(f"Error processing guide: {e}")
 
     def scrape_track_database(self):
         database_url = urljoin(self.config.base_url, '/database')
-        soup = self.get_page_content(database_url)
-        if not soup:
-            return
+        soup = self.get_page_content(database_url, TRACK_ENTRY_NODES)
+        if soup:
+            self.process_track_database(soup)
+
+    def handle_track_database(self, page_url: str, html: str):
+        PAGES.labels(SCRAPER).inc()
+        self.process_track_database(self.parse(html, TRACK_ENTRY_NODES))
 
+    def process_track_database(self, soup: BeautifulSoup):
         # Process track database content
         track_entries = soup.find_all('div', class_='track-entry')
         for entry in track_entries:
@@ -123,9 +233,25 @@ class NatureTrackingScraper:
                 logging.error(f"Error processing track entry: {e}")
 
     def run(self):
-        logging.info("Starting Nature Tracking scraper")
-        self.scrape_tracking_guides()
-        self.scrape_track_database()
+        """Crawl the site from the landing page and the database.
+
+        Database pages go to the track-entry parser, every other page to the
+        guide parser, so species pages linked from either are covered too.
+        """
+        start_metrics_server(self.config.metrics_port)
+        logging.info("Starting Nature Tracking crawl")
+        frontier = CrawlFrontier(
+            self.fetch,
+            [(r'^/database', self.handle_track_database), (r'^/(?!database)', self.handle_tracking_guides)],
+            CrawlConfig(
+                concurrency=self.config.crawl_concurrency,
+                max_depth=self.config.crawl_max_depth,
+                max_pages=self.config.crawl_max_pages,
+                respect_robots=self.config.respect_robots,
+            ),
+            queue_gauge=QUEUE_DEPTH.labels(SCRAPER, 'frontier'),
+        )
+        frontier.run([self.config.base_url, urljoin(self.config.base_url, '/database')])
         logging.info("Scraping completed")
 
 def main():
@@ -1,9 +1,18 @@
 import csv
 import base64
+import os
+import sys
 import matplotlib.pyplot as plt
 from io import BytesIO
 from PIL import Image
 
+# image_pack est dans le dossier parent (voir nature_tracking.py)
+_SHARED_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SHARED_DIR not in sys.path:
+    sys.path.insert(0, _SHARED_DIR)
+
+from image_pack import ImagePackReader
+
 csv.field_size_limit(10 * 1024 * 1024)  # Par exemple, 10 Mo
 
 def is_base64_encoded(data):
@@ -15,8 +24,10 @@ def is_base64_encoded(data):
         return False
 
 def display_image_from_base64(base64_string):
+    return display_image_from_bytes(base64.b64decode(base64_string))
+
+def display_image_from_bytes(image_data):
     try:
-        image_data = base64.b64decode(base64_string)
         image = Image.open(BytesIO(image_data))
         plt.imshow(image)
         plt.axis('off')  # Masquer les axes
@@ -45,7 +56,9 @@ def validate_or_remove_image(image, index, ax, row, valid_rows):
             print("Choix non valide, veuillez entrer 'v' pour valider ou 'd' pour supprimer.")
 
 # Fonction pour visualiser et valider les images
-def validate_images(csv_file, output_csv):
+def validate_images(csv_file, output_csv, pack_path=None):
+    # Avec pack_path (sortie de dl_images.py), les images des lignes ayant 'image_index' sont lues dans le pack
+    pack = ImagePackReader(pack_path) if pack_path else None
     with open(csv_file, mode='r', newline='', encoding='utf-8') as infile:
         reader = csv.DictReader(infile)
         rows = list(reader)  # Lire toutes les lignes du fichier CSV
@@ -55,15 +68,18 @@ def validate_images(csv_file, output_csv):
         plt.figure(figsize=(8, 8))
         
         for index, row in enumerate(rows):
-            base64_image = row.get('image_url')
+            if pack is not None and row.get('image_index'):
+                image = display_image_from_bytes(pack[int(row['image_index'])])
+            else:
+                base64_image = row.get('image_url')
 
-            # Vérifier si le contenu base64 est valide
-            if not base64_image or not is_base64_encoded(base64_image):
-                print(f"Ligne {index + 1} ignorée : données base64 invalides ou manquantes.")
-                continue
+                # Vérifier si le contenu base64 est valide
+                if not base64_image or not is_base64_encoded(base64_image):
+                    print(f"Ligne {index + 1} ignorée : données base64 invalides ou manquantes.")
+                    continue
 
-            # Afficher l'image
-            image = display_image_from_base64(base64_image)
+                # Afficher l'image
+                image = display_image_from_base64(base64_image)
             if image:
                 # Afficher l'image et demander la validation ou suppression
                 ax = plt.subplot(1, 1, 1)
@@ -81,4 +97,5 @@ def validate_images(csv_file, output_csv):
 # Exemple d'utilisation
 csv_file = 'tracks_with_image.csv'  # Nom de votre fichier CSV avec les images en base64
 output_csv = 'validated_images.csv'  # Fichier de sortie avec les images validées
-validate_images(csv_file, output_csv)
\ No newline at end of file
+pack_path = 'tracks_images.pack'  # Pack binaire écrit par dl_images.py, s'il existe
+validate_images(csv_file, output_csv, pack_path if os.path.exists(pack_path) else None)
\ No newline at end of file
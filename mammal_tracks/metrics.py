@@ -0,0 +1,65 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import urlparse
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+DEFAULT_PORT = 9108
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+# pages/s and images/s are rate() over these counters
+PAGES = Counter('scraper_pages_total', 'Pages (or gallery batches) processed', ['scraper'])
+IMAGES = Counter('scraper_images_total', 'Images handled, by outcome', ['scraper', 'status'])
+BYTES = Counter('scraper_downloaded_bytes_total', 'Response bytes downloaded', ['scraper'])
+REQUESTS = Counter('scraper_requests_total', 'HTTP responses received', ['scraper', 'host', 'status'])
+REQUEST_LATENCY = Histogram('scraper_request_seconds', 'Time until response headers, per host',
+                            ['scraper', 'host'], buckets=LATENCY_BUCKETS)
+RETRIES = Counter('scraper_retries_total', 'Retried operations', ['scraper'])
+SELENIUM_WAIT = Histogram('scraper_selenium_wait_seconds', 'Time spent waiting on the browser',
+                          ['scraper', 'stage'], buckets=LATENCY_BUCKETS)
+QUEUE_DEPTH = Gauge('scraper_queue_depth', 'Items waiting in a work queue', ['scraper', 'queue'])
+
+_server_port = None
+
+
+def start_metrics_server(port: Optional[int] = None) -> Optional[int]:
+    """Serve /metrics on localhost; port from SCRAPER_METRICS_PORT, 0 disables. Idempotent."""
+    global _server_port
+    if port is None:
+        port = int(os.environ.get('SCRAPER_METRICS_PORT', DEFAULT_PORT))
+    if not port or _server_port is not None:
+        return _server_port
+    try:
+        start_http_server(port, addr='127.0.0.1')
+    except OSError as e:
+        logging.warning(f"Metrics endpoint not started on port {port}: {e}")
+        return None
+    _server_port = port
+    logging.info(f"Metrics on http://127.0.0.1:{port}/metrics")
+    return port
+
+
+def observe_response(scraper: str, response, elapsed: Optional[float] = None):
+    host = urlparse(response.url).netloc
+    REQUESTS.labels(scraper, host, str(response.status_code)).inc()
+    if elapsed is None:
+        elapsed = response.elapsed.total_seconds()
+    REQUEST_LATENCY.labels(scraper, host).observe(elapsed)
+
+
+def instrument_session(session, scraper: str):
+    """Record status and latency of every response of a requests.Session."""
+    session.hooks['response'].append(lambda response, *args, **kwargs: observe_response(scraper, response))
+    return session
+
+
+@contextmanager
+def selenium_wait(scraper: str, stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        SELENIUM_WAIT.labels(scraper, stage).observe(time.perf_counter() - started)
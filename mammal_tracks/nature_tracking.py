@@ -1,22 +1,32 @@
+import argparse
 import logging
 import time
 import os
 import pandas as pd
 import requests
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from dataclasses import dataclass
 from typing import List, Dict
 from urllib.parse import urlparse
-from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.action_chains import ActionChains
 
+from checkpoint import CrawlCheckpoint
+from driver_setup import create_chrome_driver, ensure_debug_browser
+from image_store import ImageStore
+from metrics import BYTES, IMAGES, PAGES, QUEUE_DEPTH, RETRIES, instrument_session, selenium_wait, start_metrics_server
+from request_trace import TracingHTTPAdapter, retry_attempt
+from seen_urls import SeenUrlIndex
+
+SCRAPER = 'naturetracking_gallery'  # libellé des métriques Prometheus
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -29,35 +39,63 @@ class TrackedAnimal:
     scientific_name: str
     tracks: List[Dict[str, str]]
 
+# (titre, href, preview) d'un conteneur de la galerie, calculés côté navigateur
+EXTRACT_TRACKS_JS = """
+    function extractTrack(container) {
+        const link = container.matches('a.jig-link') ? container : container.querySelector('a.jig-link');
+        if (!link) return null;
+        const caption = link.querySelector('.jig-caption-title') || container.querySelector('.jig-caption-title');
+        if (!caption) return null;
+        const img = link.querySelector('img.jig-photo-image');
+        return {
+            title: caption.innerText || caption.textContent || '',
+            href: link.href,
+            preview: img ? (img.src || img.getAttribute('data-src')) : null
+        };
+    }
+"""
+
 def retry_decorator(func):
     @wraps(func)
     def wrapper(self, *args, **kwargs):
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                return func(self, *args, **kwargs)
+                with retry_attempt(attempt):
+                    return func(self, *args, **kwargs)
             except Exception as e:
                 if attempt == max_retries - 1:
                     raise
                 logging.warning(f"Attempt {attempt+1} failed: {str(e)}")
+                RETRIES.labels(SCRAPER).inc()
                 time.sleep(2 ** attempt)
         return None
     return wrapper
 
 class MammalTracksScraper:
-    def __init__(self, headless=True):
-        self.driver = self._init_driver(headless)
+    GALLERY_URL = "https://naturetracking.com/mammal-tracks/"
+
+    def __init__(self, headless=True, debugger_port=None, load_profile='layout', checkpoint=None):
+        self.driver = self._init_driver(headless, debugger_port, load_profile)
         self.wait = WebDriverWait(self.driver, 20)
+        # CrawlCheckpoint optionnel : galerie extraite et téléchargements en attente
+        self.checkpoint = checkpoint
 
-    def _init_driver(self, headless):
+    def _init_driver(self, headless, debugger_port=None, load_profile='layout'):
+        # load_profile : 'fast' (DOM seul), 'layout' (images conservées pour le
+        # chargement paresseux) ou 'full' (aucun blocage), voir driver_setup.
+        # 'layout' par défaut : la galerie est une grille justifiée dont les cases
+        # n'ont de taille qu'une fois les images chargées ; sans elles, la boucle
+        # « Load more » / défilement peut s'arrêter avant la fin de la galerie
         options = Options()
         if headless:
             options.add_argument("--headless=new")
         options.add_argument("--disable-gpu")
         options.add_argument("--no-sandbox")
         options.add_argument("--window-size=1920,1080")
-        service = Service(ChromeDriverManager().install())
-        return webdriver.Chrome(service=service, options=options)
+        # Navigateur longue durée (port de débogage) : redémarrages quasi instantanés
+        debugger_address = ensure_debug_browser(debugger_port, headless=headless) if debugger_port else None
+        return create_chrome_driver(options, debugger_address, load_profile)
 
     def _close_popups(self):
         """Ferme toutes les fenêtres superposées"""
@@ -129,66 +167,87 @@ class MammalTracksScraper:
                 last_count = len(containers)
                 unchanged = 0
             
+            if self.checkpoint:
+                self.checkpoint.set_cursor(last_count)
+
             # Tenter de charger plus de contenu
-            if not self._click_load_more():
+            with selenium_wait(SCRAPER, 'load_more'):
+                loaded = self._click_load_more()
+            if not loaded:
                 break
+            PAGES.labels(SCRAPER).inc()
 
         # Dernière vérification
         self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight)")
         time.sleep(0.02)
 
+    def _track_record(self, raw):
+        return {
+            "animal_name": raw["title"].strip(),
+            "image_url": raw["href"],  # Utiliser le href principal comme URL finale
+            "preview_url": raw["preview"],  # Conserver l'URL de preview si nécessaire
+            "filename": os.path.basename(urlparse(raw["href"]).path)
+        }
+
     def _extract_track_data(self, container):
+        # Un seul aller-retour WebDriver par conteneur
+        raw = self.driver.execute_script(
+            EXTRACT_TRACKS_JS + "return extractTrack(arguments[0]);", container
+        )
+        return self._track_record(raw) if raw else None
+
+    def _extract_all_tracks(self):
+        """Extraction en masse : un seul execute_script pour toute la galerie"""
+        raws = self.driver.execute_script(
+            EXTRACT_TRACKS_JS + """
+            return Array.from(document.querySelectorAll('.jig-imageContainer'))
+                .map(extractTrack)
+                .filter(Boolean);
+            """
+        )
+        return [self._track_record(raw) for raw in raws]
+
+    def _gallery_loaded(self):
+        """La galerie filtrée est-elle encore affichée (nouvelle tentative après une erreur) ?"""
         try:
-            # Récupérer le lien principal depuis la balise <a>
-            link_element = container.find_element(By.CSS_SELECTOR, "a.jig-link")
-            href = link_element.get_attribute('href')
-            
-            # Récupérer le titre depuis la caption
-            title_element = container.find_element(By.CSS_SELECTOR, ".jig-caption-title")
-            title = title_element.text.strip()
-            
-            # Récupérer l'image de preview
-            img_element = link_element.find_element(By.CSS_SELECTOR, "img.jig-photo-image")
-            img_src = img_element.get_attribute('src') or img_element.get_attribute('data-src')
-            
-            return {
-                "animal_name": title,
-                "image_url": href,  # Utiliser le href principal comme URL finale
-                "preview_url": img_src,  # Conserver l'URL de preview si nécessaire
-                "filename": os.path.basename(urlparse(href).path)
-            }
-        except NoSuchElementException:
-            return None
+            return (self.driver.current_url.startswith(self.GALLERY_URL)
+                    and bool(self.driver.find_elements(By.CSS_SELECTOR, ".jig-imageContainer")))
+        except Exception:
+            return False
 
     @retry_decorator
     def scrape_tracks(self):
+        if self.checkpoint and self.checkpoint.get('gallery_complete'):
+            logging.info("Galerie déjà extraite lors d'une exécution précédente (checkpoint)")
+            return TrackedAnimal(
+                scientific_name="Mammal Tracks Gallery",
+                tracks=self.checkpoint.get('tracks', [])
+            )
+
         try:
-            self.driver.get("https://naturetracking.com/mammal-tracks/")
-            
-            # Sélection du filtre Tracks
-            self.wait.until(EC.element_to_be_clickable(
-                (By.CSS_SELECTOR, "div[data-filter-slug='tracks']")
-            )).click()
-            time.sleep(0.05)  # Réduire le temps d'attente
+            if self._gallery_loaded():
+                # Reprise sur place : les "Load more" déjà cliqués restent chargés
+                logging.info("Reprise du chargement sur la galerie déjà affichée")
+            else:
+                with selenium_wait(SCRAPER, 'page_load'):
+                    self.driver.get(self.GALLERY_URL)
+
+                    # Sélection du filtre Tracks
+                    self.wait.until(EC.element_to_be_clickable(
+                        (By.CSS_SELECTOR, "div[data-filter-slug='tracks']")
+                    )).click()
+                time.sleep(0.05)  # Réduire le temps d'attente
+                PAGES.labels(SCRAPER).inc()
 
             # Chargement complet
             self._load_all_content()
 
-            # Extraction finale avec le bon sélecteur
-            links = self.driver.find_elements(By.CSS_SELECTOR, ".jig-imageContainer a.jig-link")
-            tracks = []
-            
-            for link in links:
-                try:
-                    href = link.get_attribute('href')
-                    title = link.find_element(By.CSS_SELECTOR, ".jig-caption-title").text
-                    tracks.append({
-                        "animal_name": title.strip(),
-                        "image_url": href,
-                        "filename": os.path.basename(urlparse(href).path)
-                    })
-                except NoSuchElementException:
-                    continue
+            # Extraction finale en un seul aller-retour
+            tracks = self._extract_all_tracks()
+            if self.checkpoint:
+                self.checkpoint.put('tracks', tracks)
+                self.checkpoint.put('gallery_complete', True)
+                self.checkpoint.sync()
             
             return TrackedAnimal(
                 scientific_name="Mammal Tracks Gallery",
@@ -198,48 +257,182 @@ class MammalTracksScraper:
         except Exception as e:
             logging.error(f"Erreur majeure: {str(e)}")
             self.driver.save_screenshot('error.png')
-            return None
+            raise  # nouvelle tentative par retry_decorator
 
-    def download_images(self, data, output_dir="nature_tracking"):
+    def _build_session(self, headers, pool_size):
+        """Session keep-alive partagée, dimensionnée pour le nombre de workers"""
+        session = instrument_session(requests.Session(), SCRAPER)
+        session.headers.update(headers)
+        adapter = TracingHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _host_slot(self, url):
+        """Sémaphore limitant les requêtes simultanées vers un même hôte"""
+        host = urlparse(url).netloc
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self._per_host)
+            return self._host_slots[host]
+
+    def _download_one(self, session, item, output_dir):
+        try:
+            animal_name = item['animal_name'].strip().replace(' ', '_').lower()
+            encoded_url = requests.utils.quote(item['image_url'], safe=":/")
+
+            if self._checkpoint and item['image_url'] not in self._pending:
+                # Déjà traité par l'exécution interrompue
+                item['status'] = 'skipped'
+                item['error'] = None
+                return item
+
+            if self._seen is not None and item['image_url'] in self._seen:
+                item['status'] = 'skipped'
+                item['error'] = None
+                if self._checkpoint:
+                    self._checkpoint.done(item['image_url'])
+                return item
+
+            if self._phash_index and item.get('preview_url'):
+                # Vérification sur la miniature avant de télécharger l'image complète
+                with self._host_slot(item['preview_url']):
+                    if self._rate_limiter:
+                        self._rate_limiter.acquire(item['preview_url'])
+                    value, _ = self._phash_index.check_url(session, item['preview_url'])
+                duplicate_of = value is not None and self._phash_index.claim(value, item['image_url'])
+                if duplicate_of:
+                    item['status'] = 'duplicate'
+                    item['error'] = None
+                    item['duplicate_of'] = duplicate_of
+                    if self._checkpoint:
+                        self._checkpoint.done(item['image_url'])
+                    logging.info(f"Quasi-doublon ignoré : {item['image_url']} ~ {duplicate_of}")
+                    return item
+
+            with self._host_slot(encoded_url):
+                if self._rate_limiter:
+                    self._rate_limiter.acquire(encoded_url)
+                response = session.get(encoded_url, stream=True, timeout=30)
+                response.raise_for_status()
+                chunks = self._count_bytes(response.iter_content(chunk_size=8192))
+
+                if self._store:
+                    # Stockage adressé par contenu : pas de doublon sur disque
+                    digest = self._store.put_stream(
+                        chunks, source='naturetracking', url=item['image_url'], species=animal_name
+                    )
+                    item['digest'] = digest
+                    filepath = self._store.path(digest)
+                else:
+                    # Nettoyer le nom de l'animal pour le dossier
+                    animal_dir = os.path.join('data', output_dir, animal_name)
+                    os.makedirs(animal_dir, exist_ok=True)
+
+                    # Télécharger dans le dossier de l'espèce
+                    filename = os.path.basename(urlparse(item['image_url']).path)
+                    filepath = os.path.join(animal_dir, filename)
+                    with open(filepath, 'wb') as f:
+                        for chunk in chunks:
+                            f.write(chunk)
+
+            if self._seen is not None:
+                self._seen.add(item['image_url'])
+            item['local_path'] = filepath
+            item['status'] = 'ok'
+            item['error'] = None
+            if self._checkpoint:
+                self._checkpoint.done(item['image_url'])
+            print(f"Image téléchargée : {filepath}")
+        except Exception as e:
+            item['status'] = 'failed'
+            item['error'] = str(e)
+            if self._phash_index:
+                # Sinon la reprise trouverait le hash de l'image elle-même et la classerait en doublon
+                self._phash_index.release(item['image_url'])
+            logging.error(f"Échec téléchargement {item['image_url']}: {str(e)}")
+        return item
+
+    @staticmethod
+    def _count_bytes(chunks):
+        counter = BYTES.labels(SCRAPER)
+        for chunk in chunks:
+            counter.inc(len(chunk))
+            yield chunk
+
+    def _download_tracked(self, session, item, output_dir):
+        try:
+            return self._download_one(session, item, output_dir)
+        finally:
+            QUEUE_DEPTH.labels(SCRAPER, 'downloads').dec()
+            IMAGES.labels(SCRAPER, item.get('status') or 'failed').inc()
+
+    def download_images(self, data, output_dir="nature_tracking", workers=1, per_host=4,
+                        rate_limiter=None, store=None, phash_index=None, seen=None, checkpoint=None):
+        """Télécharge les images de la galerie.
+
+        Avec workers > 1, les téléchargements passent par un pool de threads
+        partageant une seule session keep-alive ; per_host borne le nombre de
+        requêtes simultanées vers un même hôte, et rate_limiter (HostRateLimiter)
+        leur débit. Si store (ImageStore) est fourni, les images y sont écrites
+        au lieu de output_dir. Si phash_index (PerceptualIndex) est fourni, la
+        miniature 'preview_url' est hachée d'abord et les quasi-doublons ne sont
+        pas téléchargés. Les URL déjà présentes dans seen (SeenUrlIndex, partagé
+        avec les autres scrapers) sont ignorées. Avec checkpoint (CrawlCheckpoint),
+        les images restent « en attente » jusqu'à leur téléchargement et une
+        reprise ne traite que celles-ci. Chaque enregistrement reçoit
+        'status' ('ok' / 'failed' / 'duplicate' / 'skipped') et 'error'.
+        """
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'image/webp,image/*,*/*;q=0.8',
             'Referer': 'https://naturetracking.com/'
         }
-        
-        for item in data:
-            try:
-                # Nettoyer le nom de l'animal pour le dossier
-                animal_name = item['animal_name'].strip().replace(' ', '_').lower()
-                animal_dir = os.path.join(output_dir, animal_name)
-                os.makedirs(animal_dir, exist_ok=True)
-
-                # Télécharger dans le dossier de l'espèce
-                filename = os.path.basename(urlparse(item['image_url']).path)
-                filepath = os.path.join(animal_dir, filename)
-
-                filepath = os.path.join('data', filepath)
+        workers = max(1, workers)
+        self._per_host = max(1, per_host)
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+        self._rate_limiter = rate_limiter
+        self._store = store
+        self._phash_index = phash_index
+        self._seen = seen
+        self._checkpoint = checkpoint
+        if checkpoint and not checkpoint.get('downloads_started'):
+            for item in data:
+                checkpoint.add_pending(item['image_url'], {'animal_name': item['animal_name']})
+            checkpoint.put('downloads_started', True)
+        self._pending = set(checkpoint.pending()) if checkpoint else set()
 
-                encoded_url = requests.utils.quote(item['image_url'], safe=":/")
+        QUEUE_DEPTH.labels(SCRAPER, 'downloads').inc(len(data))
+        with self._build_session(headers, pool_size=max(workers, self._per_host)) as session:
+            if workers == 1:
+                for item in data:
+                    self._download_tracked(session, item, output_dir)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(
+                        lambda item: self._download_tracked(session, item, output_dir), data
+                    ))
 
-                response = requests.get(encoded_url, stream=True, headers=headers)
-                response.raise_for_status()
-                
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
-                item['local_path'] = filepath
-                print(f"Image téléchargée : {filepath}")
-            except Exception as e:
-                logging.error(f"Échec téléchargement {item['image_url']}: {str(e)}")
+        statuses = Counter(item.get('status') for item in data)
+        logging.info(
+            f"Téléchargements terminés : {statuses['ok']} réussis, {statuses['skipped']} déjà vus, "
+            f"{statuses['duplicate']} quasi-doublons, {statuses['failed']} échecs"
+        )
         return data
 
     def close(self):
         self.driver.quit()
 
 if __name__ == "__main__":
-    scraper = MammalTracksScraper(headless=False)
+    parser = argparse.ArgumentParser(description="Galerie d'empreintes de naturetracking.com")
+    parser.add_argument('--resume', action='store_true', help="reprendre l'exécution interrompue")
+    parser.add_argument('--checkpoint', default='data/checkpoints/nature_tracking.json')
+    args = parser.parse_args()
+
+    start_metrics_server()
+    checkpoint = CrawlCheckpoint(args.checkpoint, resume=args.resume)
+    scraper = MammalTracksScraper(headless=False, checkpoint=checkpoint)
     try:
         result = scraper.scrape_tracks()
         if result:
@@ -247,8 +440,12 @@ if __name__ == "__main__":
             print(f"\nNombre d'entrées récupérées: {len(df)}")
             
             if len(df) > 0:
-                scraper.download_images(df.to_dict('records'))
+                with SeenUrlIndex() as seen:
+                    scraper.download_images(df.to_dict('records'), workers=8, store=ImageStore(), seen=seen,
+                                            checkpoint=checkpoint)
                 df.to_csv("tracks.csv", index=False)
+                if not checkpoint.pending():
+                    checkpoint.finish()
                 print(f"Exemple de données:\n{df.head().to_markdown()}")
             else:
                 print("Aucune donnée valide trouvée!")
@@ -256,4 +453,5 @@ if __name__ == "__main__":
     except Exception as e:
         logging.error(f"Erreur d'exécution: {str(e)}")
     finally:
+        checkpoint.sync()
         scraper.close()
\ No newline at end of file
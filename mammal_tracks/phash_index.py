@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import sys
+import threading
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import imagehash
+from PIL import Image
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def phash_bytes(image_data) -> int:
+    """64-bit perceptual hash of an encoded image, as an int."""
+    image = Image.open(BytesIO(image_data))
+    image.draft('L', (256, 256))
+    return int(str(imagehash.phash(image)), 16)
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance for radius queries on 64-bit hashes."""
+
+    def __init__(self):
+        self.root: Optional[list] = None  # [hash, keys, {distance: child}]
+        self.size = 0
+
+    def add(self, value: int, key: str):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [key], {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [key], {}]
+                return
+            node = child
+
+    def remove(self, value: int, key: str) -> bool:
+        node = self.root
+        while node is not None:
+            d = hamming(value, node[0])
+            if d == 0:
+                if key not in node[1]:
+                    return False
+                node[1].remove(key)  # the node stays as a routing point
+                self.size -= 1
+                return True
+            node = node[2].get(d)
+        return False
+
+    def query(self, value: int, radius: int) -> List[Tuple[int, str]]:
+        """All (distance, key) within `radius` of `value`, closest first."""
+        matches = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= radius:
+                matches.extend((d, key) for key in node[1])
+            for child_d, child in node[2].items():
+                if d - radius <= child_d <= d + radius:
+                    stack.append(child)
+        return sorted(matches)
+
+
+class PerceptualIndex:
+    """Near-duplicate index: phash -> key (store digest or URL), persisted as JSON lines.
+
+    ``release`` removes a key again (e.g. its download failed); it is written
+    as a ``"removed": true`` line and replayed at load.
+    """
+
+    def __init__(self, path: Optional[str] = None, radius: int = 6):
+        self.path = path
+        self.radius = radius
+        self.tree = BKTree()
+        self.values: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    value = int(entry['phash'], 16)
+                    if entry.get('removed'):
+                        if self.values.get(entry['key']) == value:
+                            self.tree.remove(value, entry['key'])
+                            del self.values[entry['key']]
+                    else:
+                        self.tree.add(value, entry['key'])
+                        self.values[entry['key']] = value
+
+    def __len__(self) -> int:
+        return self.tree.size
+
+    def find(self, value: int) -> Optional[str]:
+        with self.lock:
+            matches = self.tree.query(value, self.radius)
+        return matches[0][1] if matches else None
+
+    def add(self, value: int, key: str):
+        with self.lock:
+            self._add(value, key)
+
+    def _add(self, value: int, key: str):
+        self.tree.add(value, key)
+        self.values[key] = value
+        self._append({'phash': f"{value:016x}", 'key': key})
+
+    def _append(self, entry: dict):
+        if self.path:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    def claim(self, value: int, key: str) -> Optional[str]:
+        """Atomically look up `value` and index it under `key` if it is new.
+
+        Returns the key of the existing near-duplicate, or None when `key` won.
+        A key never matches itself, so retrying a claim is safe.
+        """
+        with self.lock:
+            matches = [match for match in self.tree.query(value, self.radius) if match[1] != key]
+            if matches:
+                return matches[0][1]
+            if self.values.get(key) != value:
+                self._add(value, key)
+            return None
+
+    def release(self, key: str) -> bool:
+        """Forget `key`, typically after a failed download of a claimed image."""
+        with self.lock:
+            value = self.values.pop(key, None)
+            if value is None:
+                return False
+            self.tree.remove(value, key)
+            self._append({'phash': f"{value:016x}", 'key': key, 'removed': True})
+            return True
+
+    def check_bytes(self, image_data) -> Tuple[int, Optional[str]]:
+        """Return (phash, key of the near-duplicate already indexed or None)."""
+        value = phash_bytes(image_data)
+        return value, self.find(value)
+
+    def check_url(self, session, url: str, timeout: int = 10) -> Tuple[Optional[int], Optional[str]]:
+        """Online check on a small preview (thumbnail) before fetching the full image."""
+        try:
+            response = session.get(url, timeout=timeout)
+            response.raise_for_status()
+            return self.check_bytes(response.content)
+        except Exception as e:
+            logging.warning(f"Could not hash preview {url}: {e}")
+            return None, None
+
+
+def dedupe_store(store, radius: int = 6) -> Iterator[Tuple[str, str]]:
+    """Batch pass over an ImageStore, yielding (digest, near-duplicate digest kept)."""
+    index = PerceptualIndex(radius=radius)
+    seen: Set[str] = set()
+    for record in store.records():
+        if record.digest in seen:
+            continue
+        seen.add(record.digest)
+        try:
+            value, duplicate_of = index.check_bytes(store.get(record.digest))
+        except Exception as e:
+            logging.warning(f"Could not hash {record.digest}: {e}")
+            continue
+        if duplicate_of:
+            yield record.digest, duplicate_of
+        else:
+            index.add(value, record.digest)
+
+
+if __name__ == "__main__":
+    from image_store import ImageStore
+
+    store_root = sys.argv[1] if len(sys.argv) > 1 else 'data/store'
+    duplicates = list(dedupe_store(ImageStore(store_root)))
+    for digest, kept in duplicates:
+        print(f"{digest} ~ {kept}")
+    print(f"{len(duplicates)} near-duplicates found")
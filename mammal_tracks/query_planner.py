@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+@dataclass
+class QueryPage:
+    query: str
+    start: int
+
+
+class QueryPlanner:
+    """Plans Custom Search pages for one species.
+
+    - keywords are folded into a single OR query instead of one query each;
+    - pages are tried in order of their past yield for that species
+      (exponential moving average of new URLs per page, persisted as JSON);
+    - paging stops as soon as a page yields fewer than `min_yield` new URLs
+      per result returned.
+    """
+
+    def __init__(self, keywords: List[str], exclusions: List[str] = (),
+                 stats_path: str = 'data/query_stats.json', results_per_page: int = 10,
+                 max_start: int = 91, min_yield: float = 0.2, smoothing: float = 0.5):
+        self.keywords = keywords
+        self.exclusions = list(exclusions)
+        self.stats_path = stats_path
+        self.results_per_page = results_per_page
+        self.max_start = max_start
+        self.min_yield = min_yield
+        self.smoothing = smoothing
+        self.stats: Dict[str, Dict[str, float]] = {}
+        if os.path.exists(stats_path):
+            with open(stats_path, 'r', encoding='utf-8') as f:
+                self.stats = json.load(f)
+
+    def query(self, animal: str) -> str:
+        terms = ' OR '.join(f'"{k}"' if ' ' in k else k for k in self.keywords)
+        exclusions = ' '.join(f'-{e}' for e in self.exclusions)
+        return f"{animal} ({terms}) {exclusions}".strip()
+
+    def plan(self, animal: str, max_pages: int) -> List[QueryPage]:
+        """Pages to request, best past yield first; untried pages keep their natural order."""
+        history = self.stats.get(animal, {})
+        starts = range(1, self.max_start + 1, self.results_per_page)
+        # Untried pages get an optimistic prior of 1.0 so they are explored
+        ranked = sorted(starts, key=lambda start: (-history.get(str(start), 1.0), start))
+        query = self.query(animal)
+        return [QueryPage(query, start) for start in ranked[:max_pages]]
+
+    def record(self, animal: str, start: int, new_urls: int, returned: int) -> float:
+        """Store the yield of a page and return it."""
+        page_yield = new_urls / returned if returned else 0.0
+        history = self.stats.setdefault(animal, {})
+        previous = history.get(str(start))
+        if previous is None:
+            history[str(start)] = page_yield
+        else:
+            history[str(start)] = self.smoothing * page_yield + (1 - self.smoothing) * previous
+        return page_yield
+
+    def should_stop(self, page_yield: float) -> bool:
+        return page_yield < self.min_yield
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.stats_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.query_stats-', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.stats, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.stats_path)
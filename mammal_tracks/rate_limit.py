@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens/s, holding at most `burst` tokens."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it.
+
+        Tokens may go negative: concurrent callers are queued one interval
+        apart instead of all waking up at the same moment.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class HostRateLimiter:
+    """One token bucket per host, so different origins never wait on each other."""
+
+    def __init__(self, rate: float = 1.0, burst: int = 1,
+                 overrides: Optional[Dict[str, float]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = overrides or {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'HostRateLimiter':
+        return cls(
+            rate=config.host_rate,
+            burst=config.host_burst,
+            overrides=getattr(config, 'host_rate_overrides', None),
+        )
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self.lock:
+            if host not in self.buckets:
+                rate = self.overrides.get(host, self.rate)
+                self.buckets[host] = TokenBucket(rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, url: str) -> float:
+        """Block until a request to the host of `url` is allowed; return the time waited."""
+        wait = self.bucket(urlparse(url).netloc).reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
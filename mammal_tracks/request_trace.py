@@ -0,0 +1,299 @@
+import argparse
+import atexit
+import json
+import math
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+
+# Relative to the working directory; SCRAPER_TRACE_FILE overrides it, an empty value disables tracing
+DEFAULT_TRACE_FILE = os.path.join('data', 'requests.jsonl')
+
+
+class TraceLog:
+    """Append-only JSONL trace, one line per request, written in batches."""
+
+    def __init__(self, path: str, buffer_size: int = 500, flush_interval: float = 5.0):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.buffer: List[str] = []
+        self.last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def write(self, record: dict):
+        line = json.dumps(record, separators=(',', ':'))
+        with self.lock:
+            self.buffer.append(line)
+            due = (len(self.buffer) >= self.buffer_size
+                   or time.monotonic() - self.last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            lines, self.buffer = self.buffer, []
+            self.last_flush = time.monotonic()
+            if not lines:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+
+
+_trace_log: Optional[TraceLog] = None
+_trace_lock = threading.Lock()
+_context = threading.local()
+
+
+def get_trace_log() -> Optional[TraceLog]:
+    global _trace_log
+    path = os.environ.get('SCRAPER_TRACE_FILE', DEFAULT_TRACE_FILE)
+    if not path:
+        return None
+    with _trace_lock:
+        if _trace_log is None:
+            _trace_log = TraceLog(path)
+    return _trace_log
+
+
+@contextmanager
+def retry_attempt(attempt: int):
+    """Tag the requests made inside the block with a retry number (0 = first try)."""
+    previous = getattr(_context, 'retry', 0)
+    _context.retry = attempt
+    try:
+        yield
+    finally:
+        _context.retry = previous
+
+
+def trace(kind: str, url: str, method: str, status, size: Optional[int], total: float,
+          dns: float = 0.0, connect: float = 0.0, ttfb: Optional[float] = None, cache_hit: bool = False):
+    log = get_trace_log()
+    if log is None:
+        return
+    log.write({
+        'ts': round(time.time(), 3),
+        'kind': kind,
+        'url': url,
+        'method': method,
+        'status': status,
+        'bytes': size,
+        'dns_ms': round(dns * 1000, 2),
+        'connect_ms': round(connect * 1000, 2),
+        'ttfb_ms': round(ttfb * 1000, 2) if ttfb is not None else None,
+        'total_ms': round(total * 1000, 2),
+        'cache_hit': cache_hit,
+        'retry': getattr(_context, 'retry', 0),
+    })
+
+
+class _TimedConnectionMixin:
+    """Times DNS resolution and connection setup (TCP, plus TLS for https).
+
+    The host is resolved once here and urllib3 connects to the returned
+    addresses in turn, so the lookup is not repeated and connect_ms excludes
+    it. Reused keep-alive connections report 0 for both.
+    """
+
+    trace_dns = 0.0
+    trace_connect = 0.0
+
+    def _new_conn(self):
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        self.trace_dns = time.perf_counter() - started
+        if not addresses:
+            raise NewConnectionError(self, "Failed to establish a new connection: getaddrinfo returns an empty list")
+        dns_host = self._dns_host
+        error = None
+        for *_, sockaddr in addresses:
+            self._dns_host = sockaddr[0]  # numeric: urllib3's own getaddrinfo does no lookup
+            try:
+                return super()._new_conn()
+            except ConnectTimeoutError as e:  # or its subclass NewConnectionError: try the next address
+                error = e
+            finally:
+                self._dns_host = dns_host
+        raise error
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        self.trace_connect = time.perf_counter() - started - self.trace_dns
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TracingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter writing one trace record per request (see TraceLog)."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, stream=False, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+        except Exception:
+            trace('http', request.url, request.method, None, None, time.perf_counter() - started)
+            raise
+        ttfb = time.perf_counter() - started
+        connection = getattr(response.raw, '_connection', None)
+        dns = getattr(connection, 'trace_dns', 0.0)
+        connect = getattr(connection, 'trace_connect', 0.0)
+        if connection is not None:
+            connection.trace_dns = connection.trace_connect = 0.0
+        if stream:
+            length = response.headers.get('Content-Length')
+            size = int(length) if length and length.isdigit() else None
+        else:
+            size = len(response.content)  # read here (requests would right after) to time the body
+        trace('http', request.url, request.method, response.status_code, size,
+              time.perf_counter() - started, dns, connect, ttfb, cache_hit=response.status_code == 304)
+        return response
+
+
+def trace_session(session, **adapter_kwargs):
+    adapter = TracingHTTPAdapter(**adapter_kwargs)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def trace_webdriver(driver):
+    """Trace every WebDriver command sent by `driver` to chromedriver / the browser."""
+    executor = driver.command_executor
+    send = executor._request  # private, but the single choke point of RemoteConnection
+
+    def traced_request(method, url, body=None):
+        started = time.perf_counter()
+        result = send(method, url, body)
+        status = result.get('status') if isinstance(result, dict) else None
+        trace('webdriver', url, method, status, None, time.perf_counter() - started)
+        return result
+
+    executor._request = traced_request
+    return driver
+
+
+# Offline analysis
+
+def read_trace(path: str) -> Iterator[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn last line of a killed run
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def analyze(records: Iterator[dict], top: int = 10) -> Dict[str, object]:
+    by_host = defaultdict(list)
+    by_endpoint = defaultdict(list)
+    hits = defaultdict(int)
+    seen_bodies = set()
+    wasted = {'error_responses': 0, 'retries': 0, 'repeated_downloads': 0}
+    for record in records:
+        parts = urlparse(record['url'])
+        host = f"{record.get('kind', 'http')}:{parts.netloc}"
+        total = record.get('total_ms') or 0.0
+        by_host[host].append(total)
+        by_endpoint[(host, parts.path)].append(total)
+        hits[host] += bool(record.get('cache_hit'))
+        size = record.get('bytes') or 0
+        status = record.get('status')
+        if record.get('kind') != 'http' or not size:
+            continue
+        if isinstance(status, int) and status >= 400:
+            wasted['error_responses'] += size
+        elif record.get('retry'):
+            wasted['retries'] += size
+        elif status == 200 and (record['method'], record['url']) in seen_bodies:
+            wasted['repeated_downloads'] += size
+        seen_bodies.add((record['method'], record['url']))
+
+    hosts = []
+    for host, values in sorted(by_host.items()):
+        values.sort()
+        hosts.append({
+            'host': host, 'requests': len(values), 'cache_hits': hits[host],
+            'p50_ms': percentile(values, 50), 'p95_ms': percentile(values, 95), 'p99_ms': percentile(values, 99),
+        })
+    endpoints = sorted(
+        ({'endpoint': f"{host}{path}", 'requests': len(values), 'mean_ms': sum(values) / len(values),
+          'max_ms': max(values)} for (host, path), values in by_endpoint.items()),
+        key=lambda row: row['mean_ms'], reverse=True,
+    )[:top]
+    return {'hosts': hosts, 'slowest': endpoints, 'wasted_bytes': wasted}
+
+
+def print_report(report: Dict[str, object]):
+    print(f"{'host':<45} {'reqs':>7} {'hits':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in report['hosts']:
+        print(f"{row['host']:<45} {row['requests']:>7} {row['cache_hits']:>6} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    print("\nSlowest endpoints (mean)")
+    for row in report['slowest']:
+        print(f"{row['mean_ms']:>9.1f} ms  max {row['max_ms']:>9.1f} ms  x{row['requests']:<5} {row['endpoint']}")
+    wasted = report['wasted_bytes']
+    print(f"\nWasted bytes: {sum(wasted.values())} "
+          f"(error responses {wasted['error_responses']}, retries {wasted['retries']}, "
+          f"repeated downloads {wasted['repeated_downloads']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a request trace written by the scrapers")
+    parser.add_argument('path', nargs='?', default=os.environ.get('SCRAPER_TRACE_FILE') or DEFAULT_TRACE_FILE)
+    parser.add_argument('--top', type=int, default=10, help="number of slowest endpoints to list")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+    report = analyze(read_trace(args.path), args.top)
+    if args.json:
+        print(json.dumps(report, indent=1))
+    else:
+        print_report(report)
@@ -3,6 +3,13 @@ import csv
 import cv2
 import numpy as np
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from metrics import BYTES, IMAGES, PAGES, QUEUE_DEPTH, instrument_session, start_metrics_server
+from query_planner import QueryPlanner
+from request_trace import trace, trace_session
+from search_cache import CacheMiss, SearchCache
+from seen_urls import SeenUrlIndex
 
 
 # Paramètres globaux
@@ -18,7 +25,32 @@ animals = [
 EXCLUDED_DOMAINS = ["shutterstock.com", "alamy.com"]
 FOOTPRINT_KEYWORDS = ["footprint", "paw print", "track", "tracks"]
 MAX_IMAGES = 20
+MAX_PAGES = 5  # Pages au plus par espèce (une seule requête OR pour tous les mots-clés)
 CSV_FILE = "tracks.csv"
+SEEN_INDEX = "data/seen_urls"
+
+# API Custom Search (clés dans .env.local)
+API_KEY = os.environ.get("GOOGLE_CLOUD_API")
+CX = os.environ.get("SEARCH_ENGINE_ID")
+SEARCH_ENDPOINT = "https://www.googleapis.com/customsearch/v1"
+# SEARCH_OFFLINE=1 : rejoue uniquement les réponses en cache, aucun quota consommé
+SEARCH_OFFLINE = os.environ.get("SEARCH_OFFLINE") == "1"
+SCRAPER = "google"  # libellé des métriques Prometheus
+_search_cache = None
+_http_session = None
+
+def get_search_cache():
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache(offline=SEARCH_OFFLINE)
+    return _search_cache
+
+# Session keep-alive instrumentée (latence et statut par hôte dans /metrics)
+def get_http_session():
+    global _http_session
+    if _http_session is None:
+        _http_session = trace_session(instrument_session(requests.Session(), SCRAPER))
+    return _http_session
 
 # Charger les URL existantes
 def load_existing_urls():
@@ -29,6 +61,13 @@ def load_existing_urls():
         next(reader, None)  # Ignorer l'en-tête
         return set(row[1] for row in reader)
 
+# Index persistant des URL déjà vues, partagé avec les autres scrapers
+def open_seen_index():
+    seen = SeenUrlIndex(SEEN_INDEX)
+    # Migration unique de ce CSV, même si un autre scraper a déjà rempli l'index
+    seen.import_once(f"google:{os.path.abspath(CSV_FILE)}", load_existing_urls)
+    return seen
+
 # Enregistrer les nouvelles URL
 def save_to_csv(new_entries):
     file_exists = os.path.isfile(CSV_FILE)
@@ -38,98 +77,187 @@ def save_to_csv(new_entries):
             writer.writerow(["animal", "image_url"])
         writer.writerows(new_entries)
 
+# Planificateur de requêtes (mots-clés en OR, arrêt sur rendement faible)
+_query_planner = None
+
+def get_query_planner():
+    global _query_planner
+    if _query_planner is None:
+        _query_planner = QueryPlanner(FOOTPRINT_KEYWORDS, exclusions=["shutterstock", "alamy"])
+    return _query_planner
+
+# Filtrage d'un résultat de l'API
+def accept_item(item, existing_urls):
+    display_link = item.get('displayLink', '')
+    image_url = item.get('link')
+    image_snippet = item.get('snippet', '').lower()
+    
+    if not image_url or image_url in existing_urls:
+        return None
+    
+    if not any(k in image_url.lower() for k in FOOTPRINT_KEYWORDS) and not any(k in image_snippet for k in FOOTPRINT_KEYWORDS):
+        return None
+    
+    if any(domain in display_link for domain in EXCLUDED_DOMAINS):
+        return None
+    
+    return image_url
+
 # Récupération optimisée des images
-def fetch_images(animal, max_images=MAX_IMAGES):
+def fetch_images(animal, max_images=MAX_IMAGES, seen=None, cache=None, planner=None, max_pages=MAX_PAGES):
     print(f"🔍 Recherche optimisée d'images pour : {animal}")
     image_data = set()
     results_per_page = 10
-    existing_urls = load_existing_urls()
+    existing_urls = seen if seen is not None else load_existing_urls()
+    cache = cache or get_search_cache()
+    planner = planner or get_query_planner()
     
-    for keyword in FOOTPRINT_KEYWORDS:
-        pages = (max_images // results_per_page) + 1
-        for page in range(pages):
-            start_index = page * results_per_page + 1
-            query = f"{animal} {keyword} -shutterstock -alamy"
-            url = (
-                f"https://www.googleapis.com/customsearch/v1"
-                f"?q={query}&cx={CX}&key={API_KEY}&searchType=image"
-                f"&imgSize=medium&num={results_per_page}&start={start_index}"
-            )
-            
-            try:
-                response = requests.get(url)
-                print(f"🛠️ Page {page + 1} | Mot-clé : '{keyword}' | Statut : {response.status_code}")
-                response.raise_for_status()
-                
-                results = response.json()
-                for item in results.get('items', []):
-                    display_link = item.get('displayLink', '')
-                    image_url = item.get('link')
-                    image_snippet = item.get('snippet', '').lower()
-                    
-                    if not image_url or image_url in existing_urls:
-                        continue
-                    
-                    if not any(k in image_url.lower() for k in FOOTPRINT_KEYWORDS) and not any(k in image_snippet for k in FOOTPRINT_KEYWORDS):
-                        continue
-                    
-                    if any(domain in display_link for domain in EXCLUDED_DOMAINS):
-                        continue
-                    
-                    if image_url not in image_data:
-                        print(f"✅ Ajout image : {image_url}")
-                        image_data.add(image_url)
-                    
-                    if len(image_data) >= max_images:
-                        break
-            
-            except requests.exceptions.RequestException as e:
-                print(f"❗ Erreur API pour {animal} : {e}")
-                break
+    for page_number, page in enumerate(planner.plan(animal, max_pages)):
+        params = {
+            "q": page.query, "cx": CX, "key": API_KEY, "searchType": "image",
+            "imgSize": "medium", "num": results_per_page, "start": page.start,
+        }
+        
+        try:
+            results, cached = cache.fetch(get_http_session(), SEARCH_ENDPOINT, params)
+        except CacheMiss:
+            print(f"📭 Hors cache (mode hors ligne) : '{page.query}' start={page.start}")
+            break
+        except requests.exceptions.RequestException as e:
+            print(f"❗ Erreur API pour {animal} : {e}")
+            break
+        
+        if cached:
+            # Aucune requête réseau : tracée à part pour mesurer l'effet du cache
+            trace('cache', SEARCH_ENDPOINT, 'GET', None, 0, 0.0, cache_hit=True)
+        PAGES.labels(SCRAPER).inc()
+        items = results.get('items', [])
+        new_urls = 0
+        for item in items:
+            image_url = accept_item(item, existing_urls)
+            if image_url and image_url not in image_data:
+                print(f"✅ Ajout image : {image_url}")
+                IMAGES.labels(SCRAPER, 'candidate').inc()
+                image_data.add(image_url)
+                new_urls += 1
             
             if len(image_data) >= max_images:
                 break
+        
+        page_yield = planner.record(animal, page.start, new_urls, len(items))
+        print(f"🛠️ Page {page_number + 1} (start={page.start}) | {'Cache' if cached else 'API'} | "
+              f"{new_urls} nouvelles / {len(items)} ({page_yield:.0%})")
+        
+        if len(image_data) >= max_images or planner.should_stop(page_yield):
+            break
     
+    planner.save()
     return [(animal, url) for url in image_data]
 
 # Détection d'empreintes avec OpenCV
-def detect_footprints(image_url):
+MIN_CONTOUR_AREA = 1000  # Aire minimale d'un contour, en pixels de l'image pleine résolution
+REDUCTION = 4  # Décodage à 1/2, 1/4 ou 1/8 de la résolution pour le mode batch
+_DECODE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+def has_footprint_contours(image_bytes, reduction=1):
+    # Décodage direct en niveaux de gris réduits : pas d'image couleur pleine résolution
+    img_array = np.frombuffer(image_bytes, dtype=np.uint8)
+    gray = cv2.imdecode(img_array, _DECODE_FLAGS[reduction])
+    
+    if gray is None:
+        return False
+    
+    kernel = (5, 5) if reduction == 1 else (3, 3)
+    blurred = cv2.GaussianBlur(gray, kernel, 0)
+    edges = cv2.Canny(blurred, 50, 150)
+    
+    # Le seuil d'aire suit l'échelle de décodage (aire divisée par reduction²)
+    min_area = MIN_CONTOUR_AREA / (reduction * reduction)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return any(cv2.contourArea(c) > min_area for c in contours)
+
+def detect_footprints(image_url, reduction=1):
     try:
         response = requests.get(image_url)
         response.raise_for_status()
-        img_array = np.asarray(bytearray(response.content), dtype=np.uint8)
-        img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-        
-        if img is None:
-            return False
-        
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        edges = cv2.Canny(blurred, 50, 150)
-        
-        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        valid_contours = [c for c in contours if cv2.contourArea(c) > 1000]
-        
-        return len(valid_contours) > 0
+        return has_footprint_contours(response.content, reduction)
     
     except requests.exceptions.RequestException as e:
         print(f"❗ Erreur lors du téléchargement de l'image : {e}")
         return False
 
+def _fetch_candidate(session, image_url):
+    response = session.get(image_url, timeout=15)
+    response.raise_for_status()
+    BYTES.labels(SCRAPER).inc(len(response.content))
+    return response.content
+
+def detect_footprints_batch(image_urls, reduction=REDUCTION, fetch_workers=8, cpu_workers=None):
+    """Vérifie un lot d'URL ; renvoie {url: bool}.
+
+    Les téléchargements tournent dans un pool de threads (session partagée)
+    et chaque image reçue part aussitôt vers un pool de processus pour la
+    détection : réseau et CPU se recouvrent.
+    """
+    results = {}
+    fetch_queue = QUEUE_DEPTH.labels(SCRAPER, 'fetch')
+    detect_queue = QUEUE_DEPTH.labels(SCRAPER, 'detect')
+    with trace_session(instrument_session(requests.Session(), SCRAPER)) as session, \
+         ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+         ProcessPoolExecutor(max_workers=cpu_workers) as cpu_pool:
+        fetches = {fetch_pool.submit(_fetch_candidate, session, url): url for url in image_urls}
+        fetch_queue.inc(len(fetches))
+        detections = {}
+        for future in as_completed(fetches):
+            fetch_queue.dec()
+            url = fetches[future]
+            try:
+                content = future.result()
+            except requests.exceptions.RequestException as e:
+                print(f"❗ Erreur lors du téléchargement de l'image : {e}")
+                IMAGES.labels(SCRAPER, 'failed').inc()
+                results[url] = False
+                continue
+            detections[cpu_pool.submit(has_footprint_contours, content, reduction)] = url
+            detect_queue.inc()
+        
+        for future in as_completed(detections):
+            detect_queue.dec()
+            url = detections[future]
+            try:
+                results[url] = future.result()
+            except Exception as e:
+                print(f"❗ Erreur de détection pour {url} : {e}")
+                results[url] = False
+            IMAGES.labels(SCRAPER, 'footprint' if results[url] else 'rejected').inc()
+    return results
+
 # Fonction principale
 def main():
+    start_metrics_server()
     all_results = []
-    existing_urls = load_existing_urls()
+    existing_urls = open_seen_index()
     
+    # 1. Collecte des candidats pour toutes les espèces
+    candidates = []
     for animal in animals:
-        image_data = fetch_images(animal, max_images=MAX_IMAGES)
-        for animal, image_url in image_data:
-            if image_url in existing_urls:
-                continue
-            if detect_footprints(image_url):
-                all_results.append((animal, image_url))
-                existing_urls.add(image_url)
+        for animal, image_url in fetch_images(animal, max_images=MAX_IMAGES, seen=existing_urls):
+            if image_url not in existing_urls:
+                candidates.append((animal, image_url))
+    
+    # 2. Vérification en lot (téléchargements concurrents, détection multi-processus)
+    verdicts = detect_footprints_batch({image_url for _, image_url in candidates})
+    for animal, image_url in candidates:
+        if verdicts.get(image_url) and image_url not in existing_urls:
+            all_results.append((animal, image_url))
+            existing_urls.add(image_url)
     
+    existing_urls.close()
     if all_results:
         print(f"💾 Enregistrement de {len(all_results)} nouvelles lignes dans '{CSV_FILE}'")
         save_to_csv(all_results)
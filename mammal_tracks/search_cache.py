@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Optional, Tuple
+
+# Parameters that do not change the results and must not end up in cache keys or files
+VOLATILE_PARAMS = {'key'}
+
+
+class CacheMiss(KeyError):
+    """Raised in offline replay mode when a query was never cached."""
+
+
+def normalize_params(params: dict) -> dict:
+    normalized = {}
+    for name, value in params.items():
+        if name in VOLATILE_PARAMS or value is None:
+            continue
+        value = str(value).strip()
+        if name == 'q':
+            value = re.sub(r'\s+', ' ', value).lower()
+        normalized[name] = value
+    return dict(sorted(normalized.items()))
+
+
+class SearchCache:
+    """On-disk cache of JSON API responses keyed by normalized query parameters.
+
+    Entries expire after `ttl` seconds; when the cache grows past `max_bytes`
+    the least recently used entries are removed, down to `low_water` of the
+    limit. The size is kept as a running total, so the directory is only
+    walked on the first put and when the limit is crossed (which also
+    corrects the total for entries written by other processes). With ``offline=True`` only
+    cached responses are served (whatever their age) and misses raise
+    CacheMiss, so filters can be tuned without spending quota.
+    """
+
+    def __init__(self, cache_dir: str = 'data/search_cache', ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 200 * 1024 * 1024, offline: bool = False, low_water: float = 0.9):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.offline = offline
+        self.size: Optional[int] = None  # running total of the entry sizes, None until the first scan
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, endpoint: str, params: dict) -> str:
+        payload = json.dumps([endpoint, normalize_params(params)], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def get(self, endpoint: str, params: dict) -> Optional[dict]:
+        path = self.path(self.key(endpoint, params))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not self.offline and time.time() - entry['fetched_at'] > self.ttl:
+            return None
+        os.utime(path)  # LRU order for eviction
+        return entry['response']
+
+    def put(self, endpoint: str, params: dict, response: dict):
+        path = self.path(self.key(endpoint, params))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'endpoint': endpoint,
+            'params': normalize_params(params),
+            'fetched_at': time.time(),
+            'response': response,
+        }
+        fd, tmp_path = tempfile.mkstemp(prefix='.entry-', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+            f.flush()
+            written = os.fstat(f.fileno()).st_size
+        with self.lock:
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            if self.size is None:
+                self.size = self.scan()[1]
+            else:
+                self.size += written - replaced
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def scan(self) -> Tuple[list, int]:
+        """([(mtime, size, path)...], total size) of the entries on disk."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        return entries, total
+
+    def evict(self):
+        entries, total = self.scan()
+        target = self.max_bytes * self.low_water
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # evicted by another process
+            total -= size
+        self.size = total
+
+    def fetch(self, session, endpoint: str, params: dict, timeout: int = 15) -> Tuple[dict, bool]:
+        """Return (json response, served_from_cache)."""
+        cached = self.get(endpoint, params)
+        if cached is not None:
+            return cached, True
+        if self.offline:
+            raise CacheMiss(normalize_params(params))
+        response = session.get(endpoint, params=params, timeout=timeout)
+        response.raise_for_status()
+        payload = response.json()
+        self.put(endpoint, params, payload)
+        return payload, False
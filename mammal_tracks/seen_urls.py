@@ -0,0 +1,343 @@
+import array
+import bisect
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BLOOM_HEADER = struct.Struct('<8sQQQ')  # magic, bits, hash count, capacity
+BLOOM_MAGIC = b'TRKBLOOM'
+KEY_SIZE = 8
+
+
+def url_key(url: str) -> int:
+    """Stable 64-bit key for a URL (blake2b, not the salted builtin hash)."""
+    return int.from_bytes(hashlib.blake2b(url.strip().encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class SeenUrlIndex:
+    """Persistent set of already-seen URLs, shared by every scraper (and process).
+
+    On disk:
+    - ``<base>.keys``: sorted native-endian uint64 keys, memory-mapped and binary-searched;
+    - ``<base>.bloom``: Bloom filter checked first, so most misses never touch the keys;
+    - ``<base>.journal``: keys added since the last compaction, appended by every process;
+    - ``<base>.lock``: flock shared while appending or reading, exclusive while compacting
+      (msvcrt.locking on Windows, which has no shared mode: every holder is exclusive).
+
+    ``add`` appends to the journal. The journal is merged into the sorted
+    array only once it holds ``compact_ratio`` of the array's size (at least
+    ``batch_size`` keys), so merging costs O(1) amortized per key. Keys added
+    by other processes become visible within ``refresh_interval`` seconds for
+    lookups, and immediately for ``add``.
+    """
+
+    def __init__(self, base_path: str = 'data/seen_urls', batch_size: int = 1000,
+                 capacity: int = 1_000_000, error_rate: float = 0.001, compact_ratio: float = 0.25,
+                 refresh_interval: float = 1.0):
+        self.base_path = base_path
+        self.keys_path = base_path + '.keys'
+        self.bloom_path = base_path + '.bloom'
+        self.journal_path = base_path + '.journal'
+        self.imports_path = base_path + '.imports'
+        self.batch_size = batch_size
+        self.compact_ratio = compact_ratio
+        self.refresh_interval = refresh_interval
+        self.error_rate = error_rate
+        self.lock = threading.RLock()
+        os.makedirs(os.path.dirname(os.path.abspath(base_path)), exist_ok=True)
+        self._lock_fd = os.open(base_path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+
+        self._keys_file = None
+        self._keys_map = None
+        self._keys_ino = None
+        self.keys = memoryview(b'').cast('Q')
+        self._journal = None
+        with self._file_lock(exclusive=True):
+            self._open_keys()
+            self._open_bloom(max(capacity, 2 * len(self.keys)))
+            self._open_journal()
+            self._read_journal()
+        self._last_refresh = time.monotonic()
+
+    # --- stockage ---
+    @contextmanager
+    def _file_lock(self, exclusive: bool = False):
+        if fcntl is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            return
+        # msvcrt locks bytes from the current position; LK_LOCK gives up after ~10 s, so retry
+        os.lseek(self._lock_fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(self._lock_fd, msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                continue
+        try:
+            yield
+        finally:
+            os.lseek(self._lock_fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._lock_fd, msvcrt.LK_UNLCK, 1)
+
+    @staticmethod
+    def _replace(tmp_path: str, path: str) -> bool:
+        """os.replace, or False if `path` is still open in another process (Windows)."""
+        try:
+            os.replace(tmp_path, path)
+            return True
+        except PermissionError:
+            os.remove(tmp_path)
+            return False
+
+    def _open_keys(self):
+        self._close_keys()
+        self._keys_ino = None
+        if os.path.exists(self.keys_path) and os.path.getsize(self.keys_path) >= KEY_SIZE:
+            self._keys_file = open(self.keys_path, 'rb')
+            self._keys_ino = os.fstat(self._keys_file.fileno()).st_ino
+            self._keys_map = mmap.mmap(self._keys_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.keys = memoryview(self._keys_map).cast('Q')
+        else:
+            self.keys = memoryview(b'').cast('Q')
+
+    def _close_keys(self):
+        self.keys.release()
+        if self._keys_map is not None:
+            self._keys_map.close()
+            self._keys_file.close()
+        self._keys_map = self._keys_file = None
+
+    def _open_journal(self):
+        self._close_journal()
+        # Append mode (O_APPEND): 8-byte writes of concurrent processes land whole at the end
+        self._journal = open(self.journal_path, 'ab+', buffering=0)
+        self._journal_ino = os.fstat(self._journal.fileno()).st_ino
+        self._journal_offset = 0
+        self.pending = set()
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _read_journal(self):
+        end = os.fstat(self._journal.fileno()).st_size
+        # A torn write can leave a partial key at the end of the journal
+        end -= end % KEY_SIZE
+        if end > self._journal_offset:
+            self._journal.seek(self._journal_offset)
+            journal = array.array('Q')
+            journal.frombytes(self._journal.read(end - self._journal_offset))
+            self.pending.update(journal)
+            self._journal_offset = end
+
+    def _refresh(self):
+        """Catch up with other processes; call with the file lock held."""
+        keys_ino = os.stat(self.keys_path).st_ino if os.path.exists(self.keys_path) else None
+        keys_changed = keys_ino != self._keys_ino
+        if keys_changed:
+            self._open_keys()
+        if (os.stat(self.bloom_path).st_ino != self._bloom_ino or len(self.keys) > self.bloom_capacity
+                or (keys_changed and self._bloom_file is None)):
+            self._close_bloom()
+            self._open_bloom(2 * len(self.keys))
+        if os.stat(self.journal_path).st_ino != self._journal_ino:
+            self._open_journal()  # compacted by another process: those keys are in the array now
+        self._read_journal()
+        self._last_refresh = time.monotonic()
+
+    def _open_bloom(self, capacity: int):
+        if os.path.exists(self.bloom_path):
+            with open(self.bloom_path, 'rb') as f:
+                magic, bits, hashes, stored_capacity = BLOOM_HEADER.unpack(f.read(BLOOM_HEADER.size))
+            if magic == BLOOM_MAGIC and stored_capacity >= len(self.keys):
+                self._map_bloom(bits, hashes, stored_capacity)
+                return
+        self._build_bloom(capacity)
+
+    def _map_bloom(self, bits: int, hashes: int, capacity: int):
+        self.bloom_bits, self.bloom_hashes, self.bloom_capacity = bits, hashes, capacity
+        self._bloom_file = open(self.bloom_path, 'r+b')
+        self._bloom_ino = os.fstat(self._bloom_file.fileno()).st_ino
+        self.bloom = mmap.mmap(self._bloom_file.fileno(), 0)
+
+    def _close_bloom(self):
+        self.bloom.close()
+        if self._bloom_file is not None:
+            self._bloom_file.close()
+
+    def _build_bloom(self, capacity: int):
+        bits = max(8, int(-capacity * math.log(self.error_rate) / math.log(2) ** 2))
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        header = BLOOM_HEADER.pack(BLOOM_MAGIC, bits, hashes, capacity)
+        tmp_path = self.bloom_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(bytes((bits + 7) // 8))
+        if self._replace(tmp_path, self.bloom_path):
+            self._map_bloom(bits, hashes, capacity)
+        else:
+            # Still mapped by another process (Windows): private filter, rebuilt at every key reload
+            self.bloom_bits, self.bloom_hashes, self.bloom_capacity = bits, hashes, capacity
+            self._bloom_file = None
+            self._bloom_ino = os.stat(self.bloom_path).st_ino
+            self.bloom = mmap.mmap(-1, len(header) + (bits + 7) // 8)
+            self.bloom[:len(header)] = header
+        for key in self.keys:
+            self._bloom_set(key)
+
+    def _bloom_positions(self, key: int):
+        h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+        for i in range(self.bloom_hashes):
+            yield (h1 + i * h2) % self.bloom_bits
+
+    def _bloom_set(self, key: int):
+        for pos in self._bloom_positions(key):
+            byte = BLOOM_HEADER.size + (pos >> 3)
+            self.bloom[byte] |= 1 << (pos & 7)
+
+    def _bloom_maybe(self, key: int) -> bool:
+        return all(
+            self.bloom[BLOOM_HEADER.size + (pos >> 3)] & (1 << (pos & 7))
+            for pos in self._bloom_positions(key)
+        )
+
+    # --- API ---
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.pending)
+
+    def _in_keys(self, key: int) -> bool:
+        if not self._bloom_maybe(key):
+            return False
+        i = bisect.bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def _known(self, key: int) -> bool:
+        return key in self.pending or self._in_keys(key)
+
+    def __contains__(self, url: str) -> bool:
+        key = url_key(url)
+        with self.lock:
+            if self._known(key):
+                return True
+            if time.monotonic() - self._last_refresh < self.refresh_interval:
+                return False
+            with self._file_lock():
+                self._refresh()
+            return self._known(key)
+
+    def add(self, url: str) -> bool:
+        """Record `url`; return False if it was already known."""
+        return self.add_many([url]) == 1
+
+    def add_many(self, urls: Iterable[str]) -> int:
+        with self.lock:
+            with self._file_lock():
+                self._refresh()
+                new_keys = array.array('Q')
+                for url in urls:
+                    key = url_key(url)
+                    if not self._known(key):
+                        self.pending.add(key)
+                        new_keys.append(key)
+                if new_keys:
+                    # Other processes may append concurrently: our keys are re-read with theirs at the next refresh
+                    self._journal.write(new_keys.tobytes())
+            if len(self.pending) >= max(self.batch_size, self.compact_ratio * len(self.keys)):
+                self.compact()
+        return len(new_keys)
+
+    def flush(self):
+        """Make the journal durable, compacting it if it has grown past the threshold."""
+        with self.lock:
+            os.fsync(self._journal.fileno())
+            if len(self.pending) >= max(self.batch_size, self.compact_ratio * len(self.keys)):
+                self.compact()
+
+    def compact(self):
+        """Merge the journal into the sorted array and start a new, empty journal.
+
+        Runs under the exclusive file lock after re-reading the key file and
+        the journal, so keys added by other processes are merged too. Bloom
+        bits are written before the new key file is published, so a crash in
+        between can only cause a false positive, never a miss. On Windows a
+        file mapped or open in another process cannot be replaced: the journal
+        is then kept as is and merged at a later compaction.
+        """
+        with self.lock, self._file_lock(exclusive=True):
+            self._refresh()
+            # Keys replayed from the journal may already be in the array
+            new_keys = sorted(key for key in self.pending if not self._in_keys(key))
+            if new_keys:
+                if len(self.keys) + len(new_keys) <= self.bloom_capacity:
+                    for key in new_keys:
+                        self._bloom_set(key)
+                    self.bloom.flush()
+
+                merged = array.array('Q', heapq.merge(self.keys, new_keys))
+                tmp_path = self.keys_path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    merged.tofile(f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._close_keys()
+                published = self._replace(tmp_path, self.keys_path)
+                self._open_keys()
+                if not published:
+                    return
+
+                if len(self.keys) > self.bloom_capacity:
+                    self._close_bloom()
+                    self._build_bloom(2 * len(self.keys))
+
+            # A new journal file rather than a truncate: other processes notice the inode change
+            tmp_path = self.journal_path + '.tmp'
+            open(tmp_path, 'wb').close()
+            self._close_journal()
+            self._replace(tmp_path, self.journal_path)
+            self._open_journal()
+            self._read_journal()  # kept journal: its keys stay pending
+
+    def import_once(self, tag: str, urls: Callable[[], Iterable[str]]) -> int:
+        """Add urls() unless an import named `tag` was already done (by any scraper)."""
+        with self.lock:
+            if os.path.exists(self.imports_path):
+                with open(self.imports_path, 'r', encoding='utf-8') as f:
+                    if tag in f.read().splitlines():
+                        return 0
+            added = self.add_many(urls())
+            self.flush()
+            with open(self.imports_path, 'a', encoding='utf-8') as f:
+                f.write(tag + '\n')
+            return added
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self._close_journal()
+            self._close_keys()
+            self._close_bloom()
+            os.close(self._lock_fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "tracks",
 ]
 
 MIDDLEWARE = [
@@ -81,6 +82,25 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Per-process memory; point it at a shared backend (file, Redis) when several workers serve the API.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    }
+}
+
+
+# Dataset API (tracks app)
+
+TRACKS_IMAGE_STORE_DIR = BASE_DIR / "data" / "store"
+TRACKS_THUMBNAIL_DIR = BASE_DIR / "data" / "thumbnails"
+TRACKS_API_CACHE_TIMEOUT = 300
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
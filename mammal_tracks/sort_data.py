@@ -3,6 +3,8 @@ import pandas as pd
 import re
 import joblib
 
+from phash_index import PerceptualIndex, phash_bytes
+
 print('rijgoe^')
 
 # === 1. Extraction depuis les dossiers ===
@@ -33,13 +35,33 @@ def extract_from_csv(csv_path):
     df = pd.read_csv(csv_path)
     return df[["animal", "image_url"]]
 
+# === Quasi-doublons (hash perceptuel) ===
+def drop_near_duplicates(df, radius=6):
+    # Garde la première image de chaque groupe de quasi-doublons (fichiers locaux uniquement)
+    index = PerceptualIndex(radius=radius)
+    keep = []
+    for path in df["image_url"]:
+        if not isinstance(path, str) or not os.path.isfile(path):
+            keep.append(True)
+            continue
+        try:
+            with open(path, 'rb') as f:
+                value = phash_bytes(f.read())
+        except Exception:
+            keep.append(True)
+            continue
+        keep.append(index.claim(value, path) is None)
+    return df[keep]
+
 # === Fusion des données ===
-def merge_data(folders_path, filenames_path, csv_path):
+def merge_data(folders_path, filenames_path, csv_path, near_duplicate_radius=6):
     df1 = extract_from_folders(folders_path)
     df2 = extract_from_filenames(filenames_path)
     df3 = extract_from_csv(csv_path)
     df_final = pd.concat([df1, df2, df3], ignore_index=True)
     df_final.drop_duplicates(inplace=True)
+    if near_duplicate_radius is not None:
+        df_final = drop_near_duplicates(df_final, near_duplicate_radius)
     return df_final
 
 # === Execution ===
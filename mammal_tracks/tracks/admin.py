@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from .models import Image, Source, Species, ValidationDecision
+
+
+@admin.register(Image)
+class ImageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'source', 'species', 'url', 'digest')
+    list_filter = ('source',)
+    search_fields = ('url_hash', 'digest')
+    raw_id_fields = ('species',)
+
+
+@admin.register(ValidationDecision)
+class ValidationDecisionAdmin(admin.ModelAdmin):
+    list_display = ('image', 'decision', 'reviewer', 'decided_at')
+    list_filter = ('decision',)
+    raw_id_fields = ('image',)
+
+
+admin.site.register(Source)
+admin.site.register(Species)
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def enable_wal(sender, connection, **kwargs):
+    """WAL lets the API read while an ingest writes; NORMAL sync is safe with WAL."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+
+
+class TracksConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tracks'
+
+    def ready(self):
+        connection_created.connect(enable_wal, dispatch_uid='tracks.enable_wal')
@@ -0,0 +1,188 @@
+"""Bulk ingest of the scraper outputs (CSV files, URL lists, ImageStore index) into the tracks models."""
+import base64
+import binascii
+import csv
+import hashlib
+import re
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.db import transaction
+
+from .models import Image, Source, Species, ValidationDecision, url_hash
+
+BATCH_SIZE = 1000
+# Columns an image row may carry besides source and url; the upsert only overwrites those present
+OPTIONAL_FIELDS = ('species', 'filename', 'digest', 'size')
+
+csv.field_size_limit(100000000)  # tracks_with_image.csv carries base64 images
+
+
+def normalize_species(name: Optional[str]) -> Optional[str]:
+    """'Armadillo Tracks', 'red_fox', ' Red  Fox ' -> 'armadillo', 'red fox', 'red fox'."""
+    if not name:
+        return None
+    name = re.sub(r'[\s_]+', ' ', name).strip().lower()
+    name = re.sub(r'\s+tracks?$', '', name)
+    return name or None
+
+
+def batched(rows: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Ingestor:
+    """Upserts image and decision rows in batches of `batch_size`, one transaction per batch.
+
+    Image rows are dicts with 'source' and 'url' plus any of OPTIONAL_FIELDS;
+    decision rows add 'decision' and optionally 'reviewer'. Sources and
+    species are created on first sight and their ids cached.
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self.source_ids: Dict[str, int] = {}
+        self.species_ids: Dict[str, int] = {}
+
+    def ensure(self, model, cache: Dict[str, int], names) -> Dict[str, int]:
+        missing = {name for name in names if name and name not in cache}
+        if missing:
+            model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+            cache.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+        return cache
+
+    def build_images(self, batch: List[dict]) -> Dict[tuple, tuple]:
+        self.ensure(Source, self.source_ids, {row['source'] for row in batch})
+        for row in batch:
+            row['species'] = normalize_species(row.get('species'))
+        self.ensure(Species, self.species_ids, {row['species'] for row in batch})
+        images = {}
+        for row in batch:
+            image = Image(source_id=self.source_ids[row['source']], url=row['url'], url_hash=url_hash(row['url']),
+                          species_id=self.species_ids.get(row['species']), filename=row.get('filename') or '',
+                          digest=row.get('digest') or '', size=row.get('size'))
+            images[(image.source_id, image.url_hash)] = (image, row)  # last row wins within a batch
+        return images
+
+    def upsert_images(self, batch: List[dict]) -> Dict[tuple, Image]:
+        images = self.build_images(batch)
+        groups: Dict[tuple, List[Image]] = {}
+        for image, row in images.values():
+            present = tuple(field for field in OPTIONAL_FIELDS if row.get(field) not in (None, ''))
+            groups.setdefault(present, []).append(image)
+        for present, group in groups.items():
+            Image.objects.bulk_create(
+                group, batch_size=self.batch_size, update_conflicts=True,
+                unique_fields=['source', 'url_hash'], update_fields=list(present) + ['updated_at'],
+            )
+        return {key: image for key, (image, _) in images.items()}
+
+    def ingest_images(self, rows: Iterable[dict]) -> int:
+        count = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                count += len(self.upsert_images(batch))
+        return count
+
+    def ingest_decisions(self, rows: Iterable[dict]) -> int:
+        count = 0
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                images = self.upsert_images(batch)
+                # bulk_create does not return ids of upserted rows on SQLite: read them back through the unique index
+                ids = {}
+                for source_id in {source_id for source_id, _ in images}:
+                    hashes = [h for s, h in images if s == source_id]
+                    ids.update(((source_id, h), pk) for h, pk in Image.objects.filter(
+                        source_id=source_id, url_hash__in=hashes).values_list('url_hash', 'id'))
+                decisions = {}
+                for row in batch:
+                    key = (self.source_ids[row['source']], url_hash(row['url']))
+                    decisions[key] = ValidationDecision(image_id=ids[key], decision=row['decision'],
+                                                        reviewer=row.get('reviewer') or '')
+                ValidationDecision.objects.bulk_create(
+                    list(decisions.values()), batch_size=self.batch_size, update_conflicts=True,
+                    unique_fields=['image'], update_fields=['decision', 'reviewer', 'decided_at'],
+                )
+                count += len(decisions)
+        return count
+
+
+# Readers for the existing files
+
+def read_tracks_csv(path: str, source: str) -> Iterator[dict]:
+    """tracks.csv of nature_tracking.py (animal_name,image_url,filename) or scrap_google.py (animal,image_url)."""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get('image_url'):
+                yield {'source': source, 'url': row['image_url'], 'filename': row.get('filename'),
+                       'species': row.get('animal_name') or row.get('animal')}
+
+
+def read_url_list(path: str, source: str) -> Iterator[dict]:
+    """One URL per line, as in downloaded_images.txt."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            url = line.strip()
+            if url:
+                yield {'source': source, 'url': url}
+
+
+def read_image_store(store) -> Iterator[dict]:
+    for record in store.records():
+        yield {'source': record.source, 'url': record.url, 'species': record.species,
+               'digest': record.digest, 'size': record.size}
+
+
+def read_review(validated_csv: str, reviewed_csv: Optional[str] = None, reviewer: str = '',
+                pack_path: Optional[str] = None) -> Iterator[dict]:
+    """Decisions of validate_data.py.
+
+    Rows of validated_csv are 'valid'; with reviewed_csv (the file that was
+    reviewed, e.g. tracks_with_image.csv) its other rows are 'rejected'. Rows
+    are keyed like validate_data.save_image stores them: source 'validated',
+    url 'id:<id>'; rows without an id are skipped. Rows with an
+    'image_index' read their bytes from the image pack at pack_path (see
+    dl_images.py); the others carry them base64-encoded in 'image_url'.
+    """
+    pack = None
+    if pack_path:
+        from image_pack import ImagePackReader
+        pack = ImagePackReader(pack_path)
+
+    def decision_row(row, decision):
+        if pack is not None and row.get('image_index'):
+            decoded = pack[int(row['image_index'])]
+        else:
+            image_data = row.get('image_url') or ''
+            try:
+                decoded = base64.b64decode(image_data, validate=True) if image_data else b''
+            except (binascii.Error, ValueError):
+                decoded = b''
+        return {'source': 'validated', 'url': f"id:{row['id']}", 'species': row.get('animal'),
+                'digest': hashlib.sha256(decoded).hexdigest() if decoded else None,
+                'size': len(decoded) or None, 'decision': decision, 'reviewer': reviewer}
+
+    try:
+        valid_ids = set()
+        with open(validated_csv, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if row.get('id'):
+                    valid_ids.add(row['id'])
+                    if reviewed_csv is None:
+                        yield decision_row(row, ValidationDecision.VALID)
+        if reviewed_csv is None:
+            return
+        with open(reviewed_csv, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if row.get('id'):
+                    decision = ValidationDecision.VALID if row['id'] in valid_ids else ValidationDecision.REJECTED
+                    yield decision_row(row, decision)
+    finally:
+        if pack is not None:
+            pack.close()
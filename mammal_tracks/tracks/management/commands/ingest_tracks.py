@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracks.ingest import BATCH_SIZE, Ingestor, read_image_store, read_review, read_tracks_csv, read_url_list
+
+
+def source_and_path(value: str):
+    source, sep, path = value.partition('=')
+    if not sep or not source or not path:
+        raise ValueError(value)
+    return source, path
+
+
+class Command(BaseCommand):
+    help = ("Load tracks.csv files, URL lists (downloaded_images.txt), the ImageStore index "
+            "and review results into the database. Re-running updates existing rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', action='append', default=[], metavar='SOURCE=PATH',
+                            help="tracks CSV of a scraper, e.g. naturetracking=../tracks.csv (repeatable)")
+        parser.add_argument('--urls', action='append', default=[], metavar='SOURCE=PATH',
+                            help="one URL per line, e.g. inaturalist=downloaded_images.txt (repeatable)")
+        parser.add_argument('--store', help="ImageStore root (e.g. data/store): digests, sizes and species")
+        parser.add_argument('--validated', help="validated_images.csv written by validate_data.py")
+        parser.add_argument('--reviewed', help="CSV that was reviewed (tracks_with_image.csv); its other rows are rejected")
+        parser.add_argument('--pack', help="image pack of dl_images.py (tracks_images.pack) for rows with image_index")
+        parser.add_argument('--reviewer', default='', help="name recorded with the decisions")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            csv_files = [source_and_path(value) for value in options['csv']]
+            url_files = [source_and_path(value) for value in options['urls']]
+        except ValueError as e:
+            raise CommandError(f"Expected SOURCE=PATH, got {e}")
+        if options['reviewed'] and not options['validated']:
+            raise CommandError("--reviewed needs --validated")
+
+        ingestor = Ingestor(options['batch_size'])
+        started = time.perf_counter()
+        images = decisions = 0
+        for source, path in csv_files:
+            images += self.report(path, ingestor.ingest_images(read_tracks_csv(path, source)))
+        for source, path in url_files:
+            images += self.report(path, ingestor.ingest_images(read_url_list(path, source)))
+        if options['store']:
+            from image_store import ImageStore
+            store = ImageStore(options['store'])
+            try:
+                images += self.report(options['store'], ingestor.ingest_images(read_image_store(store)))
+            finally:
+                store.close()
+        if options['validated']:
+            rows = read_review(options['validated'], options['reviewed'], options['reviewer'], options['pack'])
+            decisions = self.report(options['validated'], ingestor.ingest_decisions(rows))
+        self.stdout.write(self.style.SUCCESS(
+            f"{images} images, {decisions} decisions in {time.perf_counter() - started:.1f}s"))
+
+    def report(self, path: str, count: int) -> int:
+        self.stdout.write(f"{path}: {count} rows")
+        return count
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['source', 'id'], name='image_source_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['updated_at'], name='image_updated_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='validationdecision',
+            index=models.Index(fields=['decided_at'], name='decision_decided_at_idx'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+import hashlib
+
+from django.db import models
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class Source(models.Model):
+    """Where an image was collected: 'naturetracking', 'inaturalist', 'google', 'validated'..."""
+
+    name = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Species(models.Model):
+    """Normalized species label (see ingest.normalize_species), e.g. 'red fox'."""
+
+    name = models.CharField(max_length=200, unique=True)
+
+    class Meta:
+        verbose_name_plural = 'species'
+
+    def __str__(self):
+        return self.name
+
+
+class Image(models.Model):
+    """One collected image, keyed by (source, url_hash).
+
+    ``digest`` is the SHA-256 of the bytes in the ImageStore (empty until
+    downloaded), so the same picture found by several scrapers shares it.
+    """
+
+    source = models.ForeignKey(Source, on_delete=models.PROTECT, related_name='images')
+    species = models.ForeignKey(Species, null=True, blank=True, on_delete=models.SET_NULL, related_name='images')
+    url = models.TextField()
+    url_hash = models.CharField(max_length=64)
+    filename = models.CharField(max_length=255, blank=True)
+    digest = models.CharField(max_length=64, blank=True)
+    size = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'url_hash'], name='image_source_url_hash_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['url_hash'], name='image_url_hash_idx'),
+            models.Index(fields=['species', 'id'], name='image_species_id_idx'),
+            models.Index(fields=['digest'], name='image_digest_idx'),
+            models.Index(fields=['source', 'id'], name='image_source_id_idx'),
+            models.Index(fields=['updated_at'], name='image_updated_at_idx'),
+        ]
+
+    def __str__(self):
+        return self.url
+
+    def save(self, *args, **kwargs):
+        if not self.url_hash:
+            self.url_hash = url_hash(self.url)
+        super().save(*args, **kwargs)
+
+
+class ValidationDecision(models.Model):
+    """Outcome of the manual review (validate_data.py), one per image."""
+
+    VALID = 'valid'
+    REJECTED = 'rejected'
+    DECISIONS = [(VALID, 'Valid'), (REJECTED, 'Rejected')]
+
+    image = models.OneToOneField(Image, on_delete=models.CASCADE, related_name='decision')
+    decision = models.CharField(max_length=16, choices=DECISIONS)
+    reviewer = models.CharField(max_length=100, blank=True)
+    decided_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['decision'], name='decision_idx'),
+            models.Index(fields=['decided_at'], name='decision_decided_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.image_id}: {self.decision}"
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'tracks'
+
+urlpatterns = [
+    path('species/', views.species_list, name='species-list'),
+    path('images/', views.image_list, name='image-list'),
+    path('images/export/', views.image_export, name='image-export'),
+    path('images/<int:pk>/file/', views.image_file, name='image-file'),
+    path('images/<int:pk>/thumbnail/', views.image_thumbnail, name='image-thumbnail'),
+]
@@ -0,0 +1,285 @@
+"""Read-only dataset API: species, image lists (keyset pagination), exports and image bytes.
+
+List responses carry an ETag and Last-Modified derived from the dataset
+version (latest image update or review decision) and are cached under that
+version, so an ingest invalidates them without explicit purging.
+"""
+import csv
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_safe
+
+from .ingest import normalize_species
+from .models import Image, Species, ValidationDecision
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+EXPORT_CHUNK = 2000
+THUMBNAIL_SIZES = (128, 256, 512)
+CLIENT_MAX_AGE = 60  # lists: clients revalidate with the ETag after this
+IMAGE_MAX_AGE = 7 * 24 * 3600  # image bytes are content-addressed
+IMAGE_FIELDS = ('id', 'url', 'filename', 'digest', 'size', 'source__name', 'species__name', 'decision__decision')
+
+_image_store = None
+
+
+def get_image_store():
+    global _image_store
+    if _image_store is None:
+        from image_store import ImageStore
+        _image_store = ImageStore(str(settings.TRACKS_IMAGE_STORE_DIR))
+    return _image_store
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def int_param(request, name: str, default: int, minimum: int = 0, maximum: int = None) -> int:
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+    if value < minimum:
+        raise BadRequest(f"'{name}' must be at least {minimum}")
+    if maximum is not None and value > maximum:
+        raise BadRequest(f"'{name}' must be at most {maximum}")
+    return value
+
+
+def bad_request(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return wrapper
+
+
+# Dataset version: conditional requests and cache keys
+
+def dataset_last_modified(request, *args, **kwargs):
+    """Latest image update or decision, both read from an index. Ingest never deletes rows."""
+    if not hasattr(request, 'tracks_version'):
+        stamps = [
+            Image.objects.aggregate(latest=Max('updated_at'))['latest'],
+            ValidationDecision.objects.aggregate(latest=Max('decided_at'))['latest'],
+        ]
+        stamps = [stamp for stamp in stamps if stamp]
+        request.tracks_version = max(stamps) if stamps else None
+    return request.tracks_version
+
+
+def dataset_etag(request, *args, **kwargs):
+    version = dataset_last_modified(request)
+    key = f"{version.isoformat() if version else ''}|{request.get_full_path()}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def cached_json(request, build) -> HttpResponse:
+    """JSON body of build(), cached per dataset version and full path."""
+    key = f"tracks:{dataset_etag(request)}"
+    body = cache.get(key)
+    if body is None:
+        body = json.dumps(build(), separators=(',', ':')).encode('utf-8')
+        cache.set(key, body, getattr(settings, 'TRACKS_API_CACHE_TIMEOUT', 300))
+    response = HttpResponse(body, content_type='application/json')
+    patch_cache_control(response, public=True, max_age=CLIENT_MAX_AGE)
+    return response
+
+
+dataset_conditional = condition(etag_func=dataset_etag, last_modified_func=dataset_last_modified)
+
+
+# Image lists
+
+def filtered_images(request):
+    images = Image.objects.all()
+    if request.GET.get('species'):
+        images = images.filter(species__name=normalize_species(request.GET['species']))
+    if request.GET.get('source'):
+        images = images.filter(source__name=request.GET['source'])
+    if request.GET.get('decision'):
+        images = images.filter(decision__decision=request.GET['decision'])
+    if request.GET.get('digest'):
+        images = images.filter(digest=request.GET['digest'])
+    return images
+
+
+def keyset(images, after: int, limit: int):
+    """Rows with id > after in id order: an index range scan, whatever the depth of the page."""
+    return images.filter(id__gt=after).order_by('id').values(*IMAGE_FIELDS)[:limit]
+
+
+def serialize(row: dict, links: bool = False) -> dict:
+    item = {
+        'id': row['id'], 'url': row['url'], 'source': row['source__name'], 'species': row['species__name'],
+        'filename': row['filename'], 'digest': row['digest'] or None, 'size': row['size'],
+        'decision': row['decision__decision'],
+    }
+    if links and row['digest']:
+        item['file'] = reverse('tracks:image-file', args=[row['id']])
+        item['thumbnail'] = reverse('tracks:image-thumbnail', args=[row['id']])
+    return item
+
+
+@require_safe
+@dataset_conditional
+def species_list(request):
+    def build():
+        rows = Species.objects.annotate(image_count=Count('images')).order_by('name')
+        return {'results': [{'id': row.id, 'name': row.name, 'images': row.image_count} for row in rows]}
+    return cached_json(request, build)
+
+
+@require_safe
+@bad_request
+@dataset_conditional
+def image_list(request):
+    """?species=&source=&decision=&digest= filters, ?after=<id>&limit=N pages; 'next' links the following page."""
+    after = int_param(request, 'after', 0)
+    limit = int_param(request, 'limit', DEFAULT_LIMIT, minimum=1, maximum=MAX_LIMIT)
+
+    def build():
+        rows = list(keyset(filtered_images(request), after, limit + 1))
+        next_url = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            query = request.GET.copy()
+            query['after'] = rows[-1]['id']
+            next_url = f"{request.path}?{query.urlencode()}"
+        return {'results': [serialize(row, links=True) for row in rows], 'next': next_url}
+    return cached_json(request, build)
+
+
+class Echo:
+    """Write-through buffer for csv.writer in a streaming response."""
+
+    def write(self, value):
+        return value
+
+
+def iter_images(images):
+    after = 0
+    while True:
+        chunk = list(keyset(images, after, EXPORT_CHUNK))
+        if not chunk:
+            return
+        yield from chunk
+        after = chunk[-1]['id']
+
+
+def csv_rows(rows, columns):
+    yield columns
+    for row in rows:
+        yield [row[column] for column in columns]
+
+
+@require_safe
+@bad_request
+@dataset_conditional
+def image_export(request):
+    """Whole (filtered) list as ?format=csv (default) or jsonl, streamed in keyset chunks."""
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        raise BadRequest("'format' must be csv or jsonl")
+    rows = (serialize(row) for row in iter_images(filtered_images(request)))
+    if export_format == 'jsonl':
+        content = (json.dumps(row, separators=(',', ':')) + '\n' for row in rows)
+        content_type = 'application/x-ndjson'
+    else:
+        columns = ['id', 'url', 'source', 'species', 'filename', 'digest', 'size', 'decision']
+        writer = csv.writer(Echo())
+        content = (writer.writerow(values) for values in csv_rows(rows, columns))
+        content_type = 'text/csv'
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="images.{export_format}"'
+    return response
+
+
+# Image bytes
+
+def image_digest(request, pk, *args, **kwargs):
+    if not hasattr(request, 'tracks_digest'):
+        request.tracks_digest = Image.objects.filter(pk=pk).values_list('digest', flat=True).first()
+    return request.tracks_digest or None
+
+
+def thumbnail_size(request) -> int:
+    size = int_param(request, 'size', 256)
+    if size not in THUMBNAIL_SIZES:
+        raise BadRequest(f"'size' must be one of {', '.join(map(str, THUMBNAIL_SIZES))}")
+    return size
+
+
+def thumbnail_etag(request, pk, *args, **kwargs):
+    digest = image_digest(request, pk)
+    if not digest:
+        return None
+    try:
+        return f"{digest}-{thumbnail_size(request)}"
+    except BadRequest:
+        return None
+
+
+def open_image(request, pk):
+    digest = image_digest(request, pk)
+    if not digest:
+        raise Http404("No stored bytes for this image")
+    path = get_image_store().path(digest)
+    if not os.path.exists(path):
+        raise Http404("Image bytes missing from the store")
+    return digest, path
+
+
+@require_safe
+@condition(etag_func=image_digest)
+def image_file(request, pk):
+    digest, path = open_image(request, pk)
+    url = Image.objects.filter(pk=pk).values_list('url', flat=True).first() or ''
+    content_type = mimetypes.guess_type(url.split('?')[0])[0] or 'image/jpeg'
+    response = FileResponse(open(path, 'rb'), content_type=content_type)
+    patch_cache_control(response, public=True, max_age=IMAGE_MAX_AGE)
+    return response
+
+
+@require_safe
+@bad_request
+@condition(etag_func=thumbnail_etag)
+def image_thumbnail(request, pk):
+    """JPEG thumbnail (?size=128|256|512), rendered once and kept under TRACKS_THUMBNAIL_DIR."""
+    size = thumbnail_size(request)
+    digest, path = open_image(request, pk)
+    thumb_path = os.path.join(str(settings.TRACKS_THUMBNAIL_DIR), str(size), digest[:2], f"{digest}.jpg")
+    if not os.path.exists(thumb_path):
+        from PIL import Image as PILImage
+        with PILImage.open(path) as image:
+            image.draft('RGB', (size, size))  # JPEG: decode at reduced scale
+            image = image.convert('RGB')
+            image.thumbnail((size, size))
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=85)
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.thumb-', dir=os.path.dirname(thumb_path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, thumb_path)
+    response = FileResponse(open(thumb_path, 'rb'), content_type='image/jpeg')
+    patch_cache_control(response, public=True, max_age=IMAGE_MAX_AGE)
+    return response
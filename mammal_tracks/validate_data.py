@@ -1,9 +1,15 @@
 import csv
 import base64
+import binascii
+import os
+import queue
+import threading
 import matplotlib.pyplot as plt
 from io import BytesIO
 from PIL import Image
-import os
+
+from image_pack import ImagePackReader
+from image_store import ImageStore
 
 csv.field_size_limit(10 * 1024 * 1024)  # Augmentation de la limite de taille pour les fichiers CSV
 
@@ -14,9 +20,17 @@ def is_base64_encoded(data):
     except Exception:
         return False
 
+def row_image_bytes(row, pack=None):
+    """Octets de l'image d'une ligne : pack binaire si 'image_index', sinon base64"""
+    if pack is not None and row.get('image_index'):
+        return pack[int(row['image_index'])]
+    return base64.b64decode(row['image_url'])
+
 def display_image_from_base64(base64_string):
+    return display_image_from_bytes(base64.b64decode(base64_string))
+
+def display_image_from_bytes(image_data):
     try:
-        image_data = base64.b64decode(base64_string)
         image = Image.open(BytesIO(image_data))
         plt.imshow(image)
         plt.axis('off')
@@ -44,7 +58,8 @@ def validate_or_remove_image(image, index, ax, row, valid_rows):
         else:
             print("Choix non valide. Veuillez entrer 'v' ou 'd'.")
 
-def validate_images(csv_file, output_csv=None):
+def validate_images(csv_file, output_csv=None, pack_path=None):
+    pack = ImagePackReader(pack_path) if pack_path else None
     with open(csv_file, mode='r', newline='', encoding='utf-8') as infile:
         reader = csv.DictReader(infile)
         rows = list(reader)
@@ -53,13 +68,16 @@ def validate_images(csv_file, output_csv=None):
         plt.figure(figsize=(8, 8))
         
         for index, row in enumerate(rows):
-            base64_image = row.get('image_url')
+            if pack is not None and row.get('image_index'):
+                image = display_image_from_bytes(row_image_bytes(row, pack))
+            else:
+                base64_image = row.get('image_url')
 
-            if not base64_image or not is_base64_encoded(base64_image):
-                print(f"Ligne {index + 1} ignorée : données invalides.")
-                continue
+                if not base64_image or not is_base64_encoded(base64_image):
+                    print(f"Ligne {index + 1} ignorée : données invalides.")
+                    continue
 
-            image = display_image_from_base64(base64_image)
+                image = display_image_from_base64(base64_image)
             if image:
                 ax = plt.subplot(1, 1, 1)
                 validate_or_remove_image(image, index, ax, row, valid_rows)
@@ -73,35 +91,179 @@ def validate_images(csv_file, output_csv=None):
             print(f"CSV filtré sauvegardé : {output_csv}")
 
         # Sauvegarde des images dans l'arborescence
-        save_images(valid_rows)
+        save_images(valid_rows, pack=pack)
 
         print(f"Traitement complet : {len(valid_rows)}/{len(rows)} images validées")
 
-def save_images(valid_rows):
-    os.makedirs('images', exist_ok=True)  # Création du dossier principal
+def save_image(store, row, image_data, index):
+    animal = row.get('animal', 'inconnu')
+    row_id = row.get('id') or index
+    digest = store.put(image_data, 'validated', f"id:{row_id}", animal.replace(' ', '_'))
+    print(f"Image sauvegardée : {store.path(digest)}")
+    return digest
+
+def save_images(valid_rows, store=None, pack=None):
+    # Magasin adressé par contenu (SHA-256) : noms stables, aucun doublon
+    store = store or ImageStore()
     
-    for row in valid_rows:
+    for index, row in enumerate(valid_rows):
         try:
-            animal = row.get('animal', 'inconnu')
-            image_data = base64.b64decode(row['image_url'])
-            
-            # Création du sous-dossier par espèce
-            species_dir = os.path.join('images', animal.replace(' ', '_'))
-            os.makedirs(species_dir, exist_ok=True)
-            
-            # Génération d'un nom de fichier unique
-            filename = f"{row.get('id', 'image')}_{hash(row['image_url']) & 0xFFFFFFFF}.jpg"
-            filepath = os.path.join(species_dir, filename)
-            
-            with open(filepath, 'wb') as f:
-                f.write(image_data)
-            
-            print(f"Image sauvegardée : {filepath}")
+            save_image(store, row, row_image_bytes(row, pack), index)
         except Exception as e:
             print(f"Erreur de sauvegarde pour {row.get('id')} : {e}")
 
-# Exemple d'utilisation avec les deux fonctionnalités
-validate_images(
+# === Revue en flux avec préchargement en arrière-plan ===
+_END = object()
+
+def decode_preview(image_data, max_size=(1024, 1024)):
+    """Décode une seule fois, en basse résolution (mode draft de Pillow pour les JPEG)"""
+    image = Image.open(BytesIO(image_data))
+    image.draft('RGB', max_size)  # Sans effet pour les formats autres que JPEG
+    image.thumbnail(max_size)
+    image.load()
+    return image
+
+class ImagePrefetcher:
+    """Thread qui lit le CSV ligne par ligne et prépare les N images suivantes.
+
+    Chaque élément produit est (index, row, image_data, image) ; image vaut
+    None si la ligne est invalide ou l'image illisible.
+    """
+
+    def __init__(self, csv_file, pack=None, depth=4, max_size=(1024, 1024)):
+        self.csv_file = csv_file
+        self.pack = pack
+        self.max_size = max_size
+        self.items = queue.Queue(maxsize=depth)
+        self.stopped = threading.Event()
+        self.fieldnames = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+
+    def _load(self, row):
+        if self.pack is not None and row.get('image_index'):
+            image_data = self.pack[int(row['image_index'])]
+        else:
+            base64_image = row.get('image_url')
+            if not base64_image:
+                return None, None
+            try:
+                # Un seul décodage : validate=True remplace is_base64_encoded
+                image_data = base64.b64decode(base64_image, validate=True)
+            except (binascii.Error, ValueError):
+                return None, None
+        try:
+            return image_data, decode_preview(image_data, self.max_size)
+        except Exception as e:
+            print(f"Erreur lors du décodage de l'image : {e}")
+            return image_data, None
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.items.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            with open(self.csv_file, mode='r', newline='', encoding='utf-8') as infile:
+                reader = csv.DictReader(infile)
+                self.fieldnames = reader.fieldnames
+                self.ready.set()
+                for index, row in enumerate(reader):
+                    image_data, image = self._load(row)
+                    if not self._put((index, row, image_data, image)):
+                        return
+        finally:
+            self.ready.set()
+            self._put(_END)
+
+    def __iter__(self):
+        while True:
+            item = self.items.get()
+            if item is _END:
+                return
+            yield item
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join(timeout=1)
+
+def ask_decision(index):
+    while True:
+        choice = input(f"Image {index + 1}: Valider (v) ou Supprimer (d) ? ").strip().lower()
+        if choice in ('v', 'd'):
+            return choice == 'v'
+        print("Choix non valide. Veuillez entrer 'v' ou 'd'.")
+
+def review_images(csv_file, output_csv=None, pack_path=None, prefetch=4, max_size=(1024, 1024),
+                  store=None):
+    """Revue en flux : une seule figure réutilisée, images suivantes préparées en arrière-plan.
+
+    Les lignes validées sont écrites au fil de l'eau dans output_csv et leurs
+    images dans le magasin ; aucune liste complète de lignes n'est gardée en mémoire.
+    """
+    pack = ImagePackReader(pack_path) if pack_path else None
+    store = store or ImageStore()
+    prefetcher = ImagePrefetcher(csv_file, pack=pack, depth=prefetch, max_size=max_size)
+    prefetcher.ready.wait()
+
+    outfile = writer = None
+    if output_csv and prefetcher.fieldnames:
+        outfile = open(output_csv, mode='w', newline='', encoding='utf-8')
+        writer = csv.DictWriter(outfile, fieldnames=prefetcher.fieldnames)
+        writer.writeheader()
+
+    plt.ion()
+    fig, ax = plt.subplots(figsize=(8, 8))
+    ax.axis('off')
+    artist = None
+    total = validated = 0
+    try:
+        for index, row, image_data, image in prefetcher:
+            total += 1
+            if image is None:
+                print(f"Ligne {index + 1} ignorée : données invalides.")
+                continue
+
+            if artist is None:
+                artist = ax.imshow(image)
+            else:
+                artist.set_data(image)
+                artist.set_extent((-0.5, image.width - 0.5, image.height - 0.5, -0.5))
+                ax.set_xlim(-0.5, image.width - 0.5)
+                ax.set_ylim(image.height - 0.5, -0.5)
+            fig.canvas.draw_idle()
+            plt.pause(0.001)
+
+            if ask_decision(index):
+                validated += 1
+                print(f"Image {index + 1} validée.")
+                if writer:
+                    writer.writerow(row)
+                try:
+                    save_image(store, row, image_data, index)
+                except Exception as e:
+                    print(f"Erreur de sauvegarde pour {row.get('id')} : {e}")
+            else:
+                print(f"Image {index + 1} supprimée.")
+    finally:
+        prefetcher.close()
+        plt.close(fig)
+        if outfile:
+            outfile.close()
+            print(f"CSV filtré sauvegardé : {output_csv}")
+
+    print(f"Traitement complet : {validated}/{total} images validées")
+
+# Exemple d'utilisation avec les deux fonctionnalités (revue en flux avec préchargement)
+PACK_PATH = 'tracks_images.pack'  # écrit par dl_images.py ; absent pour un ancien CSV en base64
+review_images(
     csv_file='tracks_with_image.csv',
-    output_csv='validated_images.csv'  # Optionnel
+    output_csv='validated_images.csv',  # Optionnel
+    pack_path=PACK_PATH if os.path.exists(PACK_PATH) else None
 )
\ No newline at end of file